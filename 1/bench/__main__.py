@@ -0,0 +1,94 @@
+import argparse
+import json
+import sys
+
+from bench.startup import STAGES, measure_startup
+from bench.suite import CASES, DISTRIBUTIONS, MIN_SECONDS, REPEATS, compare, run_suite
+
+
+def _ns(value):
+    return f"{value:10.1f} нс/оп" if value is not None else " " * 16
+
+
+def _print_result(result):
+    memory = f"{result['peak_bytes'] / 2 ** 20:9.1f} МБ" if result['peak_bytes'] is not None else ""
+    print(f"{result['case']:>15} {result['distribution']:>10} n={result['n']:<9} "
+          f"{result['seconds']:9.4f} с {_ns(result['ns_per_op'])} {memory}", file=sys.stderr)
+
+
+def _ratio(value):
+    return f"{value:6.2f}x" if value is not None else "     -"
+
+
+def _write_report(report, output):
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Замеры операций AVLTree")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="прогнать замеры и записать JSON")
+    run.add_argument('--sizes', type=int, nargs='+', default=[10 ** 3, 10 ** 4, 10 ** 5],
+                     help="размеры деревьев, например 1000 10000 ... 10000000")
+    run.add_argument('--distributions', nargs='+', choices=list(DISTRIBUTIONS))
+    run.add_argument('--cases', nargs='+', choices=list(CASES))
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--no-memory', action='store_true', help="не замерять пиковую память")
+    run.add_argument('--repeats', type=int, default=REPEATS, help="повторов замера каждого случая")
+    run.add_argument('--min-time', type=float, default=MIN_SECONDS,
+                     help="наименьшая длительность повтора, с; быстрые случаи запускаются многократно")
+    run.add_argument('-o', '--output', help="файл результата (по умолчанию stdout)")
+
+    diff = commands.add_parser('compare', help="сравнить два файла результатов")
+    diff.add_argument('old')
+    diff.add_argument('new')
+    diff.add_argument('--threshold', type=float, default=0.1, help="допустимое ухудшение, доля")
+    diff.add_argument('--min-time', type=float, default=MIN_SECONDS,
+                      help="замеры короче не сравниваются по времени, с")
+
+    startup = commands.add_parser('startup', help="замерить холодный запуск visualization.py")
+    startup.add_argument('--renderer', choices=['canvas', 'matplotlib'], default='canvas')
+    startup.add_argument('--runs', type=int, default=5)
+    startup.add_argument('--timeout', type=float, default=30.0, help="сколько ждать первое дерево, с")
+    startup.add_argument('--target', type=float, default=0.5, help="допустимое время до появления окна, с")
+    startup.add_argument('-o', '--output', help="файл результата (по умолчанию stdout)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        report = run_suite(args.sizes, args.distributions, args.cases, args.seed,
+                           memory=not args.no_memory, log=_print_result,
+                           repeats=args.repeats, min_seconds=args.min_time)
+        _write_report(report, args.output)
+        return 0
+
+    if args.command == 'startup':
+        report = measure_startup(args.renderer, args.runs, args.timeout)
+        for stage in STAGES:
+            value = report['median'][stage]
+            shown = f"{value:.3f} с" if value is not None else "нет замера (нет дисплея или не дождались)"
+            print(f"{stage:>12} {shown}", file=sys.stderr)
+        _write_report(report, args.output)
+        window = report['median']['window']
+        return 1 if window is not None and window > args.target else 0
+
+    with open(args.old, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(args.new, encoding='utf-8') as f:
+        new = json.load(f)
+    rows = compare(old, new, args.threshold, args.min_time)
+    for row in rows:
+        mark = "РЕГРЕССИЯ" if row['regressed'] else ""
+        print(f"{row['case']:>15} {row['distribution']:>10} n={row['n']:<9} "
+              f"время {_ratio(row['time_ratio'])} память {_ratio(row['memory_ratio'])} {mark}")
+    return 1 if any(row['regressed'] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
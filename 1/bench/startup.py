@@ -0,0 +1,74 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+# Каталог с visualization.py
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Замер одного холодного запуска в отдельном процессе: импорт модуля, появление окна,
+# первое нарисованное дерево. Без дисплея замеряется только импорт
+_SCRIPT = r'''
+import json, sys, time
+started = time.perf_counter()
+import visualization
+imported = time.perf_counter() - started
+window = first_tree = root = None
+try:
+    import tkinter as tk
+except ImportError:
+    tk = None
+if tk is not None:
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pass
+if root is not None:
+    app = visualization.TreeVisualization(root, sys.argv[1])
+    root.update()
+    window = time.perf_counter() - started
+    # Если первое дерево не построилось, не ждём его вечно
+    deadline = time.perf_counter() + float(sys.argv[2])
+    while not app.current_frames and time.perf_counter() < deadline:
+        root.update()
+        time.sleep(0.001)
+    if app.current_frames:
+        root.update()
+        first_tree = time.perf_counter() - started
+    root.destroy()
+print(json.dumps({'import': imported, 'window': window, 'first_tree': first_tree,
+                  'matplotlib_loaded': 'matplotlib' in sys.modules}))
+'''
+
+STAGES = ('import', 'window', 'first_tree')
+
+
+def measure_startup(renderer='canvas', runs=5, timeout=30.0):
+    samples = []
+    for _ in range(runs):
+        try:
+            done = subprocess.run([sys.executable, '-c', _SCRIPT, renderer, str(timeout)], cwd=ROOT,
+                                  capture_output=True, text=True, check=True, timeout=2 * timeout)
+        except subprocess.TimeoutExpired:
+            # Процесс завис, например на модальном окне с ошибкой
+            samples.append(dict.fromkeys(STAGES))
+            continue
+        samples.append(json.loads(done.stdout))
+    median = {}
+    for stage in STAGES:
+        values = [sample[stage] for sample in samples if sample[stage] is not None]
+        median[stage] = statistics.median(values) if values else None
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'renderer': renderer,
+        'runs': samples,
+        'median': median,
+    }
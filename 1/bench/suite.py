@@ -0,0 +1,260 @@
+import bisect
+import gc
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+
+from main import AVLTree
+
+# Сколько запросов делают точечные операции (поиск, split) независимо от n
+QUERIES = 1000
+
+
+# Распределения ключей, все детерминированы через seed
+def _uniform(n, rnd):
+    return [rnd.randrange(4 * n) for _ in range(n)]
+
+
+def _sorted(n, rnd):
+    return list(range(n))
+
+
+def _reverse(n, rnd):
+    return list(range(n, 0, -1))
+
+
+def _duplicates(n, rnd):
+    return [rnd.randrange(max(1, n // 100)) for _ in range(n)]
+
+
+DISTRIBUTIONS = {
+    'uniform': _uniform,
+    'sorted': _sorted,
+    'reverse': _reverse,
+    'duplicates': _duplicates,
+}
+
+
+# Случай = (подготовка вне замера, замеряемая операция). Подготовка получает ключи и
+# генератор случайных чисел, возвращает состояние; операция возвращает число выполненных действий
+def _queries(keys, rnd):
+    return [rnd.choice(keys) for _ in range(QUERIES)] if keys else []
+
+
+def _insert(state):
+    tree = AVLTree()
+    for val in state:
+        tree.insert(val)
+    return len(state)
+
+
+def _insert_many(state):
+    AVLTree().insert_many(state)
+    return len(state)
+
+
+def _from_iterable(state):
+    AVLTree.from_iterable(state)
+    return len(state)
+
+
+def _delete(state):
+    tree, keys = state
+    for val in keys:
+        tree.delete(val)
+    return len(keys)
+
+
+def _search_count(state):
+    tree, queries = state
+    for val in queries:
+        tree.search_count(val)
+    return len(queries)
+
+
+def _split(state):
+    tree, queries = state
+    for val in queries:
+        tree.split(val)
+    return len(queries)
+
+
+def _merge(state):
+    left, right = state
+    AVLTree.merge(left, right)
+    return 1
+
+
+def _traversal(name):
+    def _run(tree):
+        return len(getattr(tree, name)())
+    return _run
+
+
+def _bisect_insort(state):
+    items = []
+    for val in state:
+        bisect.insort(items, val)
+    return len(state)
+
+
+def _bisect_count(state):
+    items, queries = state
+    for val in queries:
+        bisect.bisect_right(items, val) - bisect.bisect_left(items, val)
+    return len(queries)
+
+
+def _builtin_sorted(state):
+    sorted(state)
+    return len(state)
+
+
+def _halves(keys, rnd):
+    shuffled = list(keys)
+    rnd.shuffle(shuffled)
+    middle = len(shuffled) // 2
+    return AVLTree.from_iterable(shuffled[:middle]), AVLTree.from_iterable(shuffled[middle:])
+
+
+CASES = {
+    'insert': (lambda keys, rnd: keys, _insert),
+    'insert_many': (lambda keys, rnd: keys, _insert_many),
+    'from_iterable': (lambda keys, rnd: keys, _from_iterable),
+    'delete': (lambda keys, rnd: (AVLTree.from_iterable(keys), keys), _delete),
+    'search_count': (lambda keys, rnd: (AVLTree.from_iterable(keys), _queries(keys, rnd)), _search_count),
+    'split': (lambda keys, rnd: (AVLTree.from_iterable(keys), _queries(keys, rnd)), _split),
+    'merge': (_halves, _merge),
+    'preorder': (lambda keys, rnd: AVLTree.from_iterable(keys), _traversal('preorder_traversal')),
+    'inorder': (lambda keys, rnd: AVLTree.from_iterable(keys), _traversal('inorder_traversal')),
+    'postorder': (lambda keys, rnd: AVLTree.from_iterable(keys), _traversal('postorder_traversal')),
+    # Эталоны из стандартной библиотеки
+    'bisect_insort': (lambda keys, rnd: keys, _bisect_insort),
+    'bisect_count': (lambda keys, rnd: (sorted(keys), _queries(keys, rnd)), _bisect_count),
+    'builtin_sorted': (lambda keys, rnd: keys, _builtin_sorted),
+}
+
+
+# Операция портит своё состояние, поэтому перед каждым запуском нужна новая подготовка
+FRESH_STATE = {'delete'}
+REPEATS = 5        # повторов замера, в результат идут минимум и медиана
+MIN_SECONDS = 0.05  # повтор длится не меньше: короткие случаи запускаются по нескольку раз
+
+
+# Один повтор: случай запускается, пока суммарное время не дойдёт до min_seconds.
+# Возвращает (действий за запуск, запусков, секунд всего, лучший запуск)
+def _time_case(case, keys, seed, min_seconds):
+    setup, run = CASES[case]
+    state = setup(keys, random.Random(seed))
+    runs = seconds = 0
+    best = None
+    gc.collect()
+    while seconds < min_seconds:
+        if runs and case in FRESH_STATE:
+            state = setup(keys, random.Random(seed))
+        started = time.perf_counter()
+        ops = run(state)
+        elapsed = time.perf_counter() - started
+        runs += 1
+        seconds += elapsed
+        best = elapsed if best is None else min(best, elapsed)
+        if not ops:
+            break
+    return ops, runs, seconds, best
+
+
+def _peak_memory(case, keys, seed):
+    # Память меряется отдельным прогоном: tracemalloc сильно замедляет операции
+    setup, run = CASES[case]
+    state = setup(keys, random.Random(seed))
+    gc.collect()
+    tracemalloc.start()
+    run(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+# Повторы идут кругами по всем случаям одного размера, а не подряд: скорость машины
+# плавает на десятки процентов за секунды, и минимум по разнесённым во времени
+# повторам устойчивее минимума по соседним
+def run_suite(sizes, distributions=None, cases=None, seed=0, memory=True, log=None,
+              repeats=REPEATS, min_seconds=MIN_SECONDS):
+    results = []
+    for n in sizes:
+        keysets = [(distribution, DISTRIBUTIONS[distribution](n, random.Random(seed)))
+                   for distribution in distributions or DISTRIBUTIONS]
+        samples = {}
+        for _ in range(repeats):
+            for distribution, keys in keysets:
+                for case in cases or CASES:
+                    samples.setdefault((distribution, case), []).append(
+                        _time_case(case, keys, seed, min_seconds))
+        for distribution, keys in keysets:
+            for case in cases or CASES:
+                timings = samples[distribution, case]
+                ops = timings[0][0]
+                ns = [seconds * 1e9 / (ops * runs) for _, runs, seconds, _ in timings] if ops else []
+                result = {
+                    'case': case,
+                    'distribution': distribution,
+                    'n': n,
+                    'ops': ops,
+                    'seconds': min(best for *_, best in timings),
+                    'ns_per_op': min(ns) if ns else None,
+                    'ns_per_op_median': statistics.median(ns) if ns else None,
+                    'repeats': repeats,
+                    'runs': sum(runs for _, runs, _, _ in timings),
+                    'measured_seconds': sum(seconds for _, _, seconds, _ in timings),
+                    'peak_bytes': _peak_memory(case, keys, seed) if memory else None,
+                }
+                results.append(result)
+                if log:
+                    log(result)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'seed': seed,
+            'repeats': repeats,
+            'min_seconds': min_seconds,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+# Время действия в прогоне; None, если замер слишком короткий, чтобы отличить его от шума.
+# Старые файлы без повторов сравниваются по единственному замеру
+def _ns_per_op(result, min_seconds):
+    if result.get('measured_seconds', result['seconds']) < min_seconds or not result['ops']:
+        return None
+    return result['ns_per_op']
+
+
+# Сравнение двух прогонов: регрессия - замедление или рост памяти больше порога
+def compare(old, new, threshold=0.1, min_seconds=MIN_SECONDS):
+    baseline = {(r['case'], r['distribution'], r['n']): r for r in old['results']}
+    rows = []
+    for result in new['results']:
+        before = baseline.get((result['case'], result['distribution'], result['n']))
+        if before is None:
+            continue
+        now, then = _ns_per_op(result, min_seconds), _ns_per_op(before, min_seconds)
+        time_ratio = now / then if now is not None and then else None
+        memory_ratio = None
+        if result['peak_bytes'] is not None and before['peak_bytes']:
+            memory_ratio = result['peak_bytes'] / before['peak_bytes']
+        regressed = any(ratio is not None and ratio > 1 + threshold for ratio in (time_ratio, memory_ratio))
+        rows.append({
+            'case': result['case'],
+            'distribution': result['distribution'],
+            'n': result['n'],
+            'time_ratio': time_ratio,
+            'memory_ratio': memory_ratio,
+            'regressed': regressed,
+        })
+    return rows
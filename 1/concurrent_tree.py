@@ -0,0 +1,151 @@
+import random
+import threading
+from collections import Counter
+
+from main import AVLTree
+
+
+class ConcurrentAVLTree:
+    # Писатели по очереди работают под блокировкой и после каждой операции публикуют снимок.
+    # Читатели берут опубликованный снимок без блокировок: его узлы больше никогда не меняются,
+    # а запись копирует только свой путь (см. AVLTree.snapshot)
+    def __init__(self, tree=None, multiset=False):
+        self._tree = tree if tree is not None else AVLTree(multiset)
+        self._lock = threading.Lock()
+        self._view = self._tree.snapshot()
+
+    def _write(self, method, *args):
+        with self._lock:
+            result = getattr(self._tree, method)(*args)
+            # Присваивание атрибута атомарно: читатель видит либо старый, либо новый корень
+            self._view = self._tree.snapshot()
+        return result
+
+    # Согласованный срез для нескольких чтений подряд
+    def snapshot(self):
+        return self._view
+
+    def insert(self, val):
+        self._write('insert', val)
+
+    def delete(self, val):
+        self._write('delete', val)
+
+    def insert_many(self, values):
+        return self._write('insert_many', values)
+
+    def delete_many(self, values):
+        return self._write('delete_many', values)
+
+    def __len__(self):
+        return len(self._view)
+
+    def search_count(self, value):
+        return self._view.search_count(value)
+
+    def rank(self, value):
+        return self._view.rank(value)
+
+    def select(self, k):
+        return self._view.select(k)
+
+    def count_range(self, lo, hi):
+        return self._view.count_range(lo, hi)
+
+    def lower_bound(self, value):
+        return self._view.lower_bound(value)
+
+    def upper_bound(self, value):
+        return self._view.upper_bound(value)
+
+    def floor(self, value):
+        return self._view.floor(value)
+
+    def ceiling(self, value):
+        return self._view.ceiling(value)
+
+    def irange(self, lo=None, hi=None, reverse=False):
+        return self._view.irange(lo, hi, reverse)
+
+    def iter_preorder(self):
+        return self._view.iter_preorder()
+
+    def iter_inorder(self):
+        return self._view.iter_inorder()
+
+    def iter_postorder(self):
+        return self._view.iter_postorder()
+
+    def preorder_traversal(self):
+        return self._view.preorder_traversal()
+
+    def inorder_traversal(self):
+        return self._view.inorder_traversal()
+
+    def postorder_traversal(self):
+        return self._view.postorder_traversal()
+
+    def split(self, value):
+        return self._view.split(value)
+
+    def validate(self):
+        return self._view.validate()
+
+
+# Стресс-проверка: писатели и читатели работают одновременно, каждый срез должен быть корректным
+def stress_test(writers=2, readers=4, ops=5000, key_range=1000, seed=0):
+    tree = ConcurrentAVLTree()
+    expected = Counter()
+    expected_lock = threading.Lock()
+    done = threading.Event()
+    errors = []
+
+    def _writer(i):
+        rnd = random.Random(seed + i)
+        for _ in range(ops):
+            val = rnd.randrange(key_range)
+            # Эталон обновляется вместе с деревом, чтобы порядок операций совпадал
+            with expected_lock:
+                if rnd.random() < 0.6:
+                    tree.insert(val)
+                    expected[val] += 1
+                elif expected[val]:
+                    tree.delete(val)
+                    expected[val] -= 1
+
+    def _reader(i):
+        rnd = random.Random(seed + writers + i)
+        while not done.is_set():
+            view = tree.snapshot()
+            if not view.validate():
+                errors.append("срез не сбалансирован")
+                return
+            keys = list(view.irange())
+            if len(keys) != len(view) or keys != sorted(keys):
+                errors.append("срез не согласован")
+                return
+            lo = rnd.randrange(key_range)
+            if view.count_range(lo, lo + 10) != sum(1 for _ in view.irange(lo, lo + 10)):
+                errors.append("count_range расходится с irange")
+                return
+
+    writer_threads = [threading.Thread(target=_writer, args=(i,)) for i in range(writers)]
+    reader_threads = [threading.Thread(target=_reader, args=(i,)) for i in range(readers)]
+    for thread in writer_threads + reader_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    done.set()
+    for thread in reader_threads:
+        thread.join()
+
+    if not tree.validate():
+        errors.append("итоговое дерево не сбалансировано")
+    if list(tree.irange()) != sorted(expected.elements()):
+        errors.append("итоговое дерево расходится с эталоном")
+    return errors
+
+
+if __name__ == "__main__":
+    problems = stress_test()
+    print("\n".join(problems) if problems else "Ошибок не найдено")
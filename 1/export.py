@@ -0,0 +1,149 @@
+import argparse
+import multiprocessing
+import os
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from layout import LayoutCache
+from main import AVLTree, Node
+
+NODE_COLOR = '#89CFF0'
+INCH_PER_UNIT = 0.45   # ширина рисунка на единицу раскладки
+INCH_PER_LEVEL = 0.6
+MAX_INCHES = 300       # больше рисунок не растёт, узлы мельчают
+MAX_LABELS = 5000      # у деревьев крупнее подписи не рисуются
+
+
+# Форма дерева для передачи в процесс: ключи и кратности в прямом порядке обхода плюс
+# по байту на узел с флагами детей (1 - левый, 2 - правый). Двоичный формат AVLTree.save
+# хранит только ключи, а для картинки нужна именно форма
+def _serialize(tree):
+    vals, counts, shape = array('q'), array('q'), bytearray()
+    for node in tree.iter_preorder():
+        vals.append(node.val)
+        counts.append(node.count)
+        shape.append((node.left is not None) | (node.right is not None) << 1)
+    return vals.tobytes(), counts.tobytes(), bytes(shape)
+
+
+def _deserialize(payload):
+    vals, counts, shape = array('q'), array('q'), payload[2]
+    vals.frombytes(payload[0])
+    counts.frombytes(payload[1])
+    tree = AVLTree()
+    nodes = []
+    pending = []  # (узел, нужен левый, нужен правый) ещё без всех детей
+    for i, val in enumerate(vals):
+        node = Node(val, uid=i)
+        node.count = counts[i]
+        nodes.append(node)
+        if pending:
+            parent, wants_left, wants_right = pending[-1]
+            if wants_left:
+                parent.left = node
+                pending[-1] = (parent, False, wants_right)
+            else:
+                parent.right = node
+                pending[-1] = (parent, False, False)
+            if not pending[-1][1] and not pending[-1][2]:
+                pending.pop()
+        else:
+            tree.root = node
+        if shape[i]:
+            pending.append((node, bool(shape[i] & 1), bool(shape[i] & 2)))
+    # В прямом порядке дети идут после родителя, так что обратный проход - снизу вверх
+    for node in reversed(nodes):
+        tree.update_height(node)
+    return tree
+
+
+def _render(tree, path, dpi):
+    # Рисунок без pyplot: ничего не регистрируется глобально, формат выбирается по расширению
+    from matplotlib.collections import LineCollection
+    from matplotlib.figure import Figure
+
+    layout = LayoutCache()
+    layout.update(tree)
+    live = layout.uids >= 0
+    xs, ys = layout.xs, layout.ys
+    span = float(np.nanmax(xs) - np.nanmin(xs)) + 1 if live.any() else 1.0
+    levels = float(-np.nanmin(ys)) + 1 if live.any() else 1.0
+    width = min(max(span * INCH_PER_UNIT, 4), MAX_INCHES)
+    height = min(max(levels * INCH_PER_LEVEL, 3), MAX_INCHES)
+    # Пунктов на единицу раскладки: узел вписывается и в шаг по горизонтали, и в шаг
+    # между уровнями, иначе у маленьких деревьев соседние уровни налезают друг на друга.
+    # В растянутом до наименьшего размера рисунке узлы не крупнее обычного
+    unit = min(width * 72 / span, height * 72 / levels, min(INCH_PER_UNIT, INCH_PER_LEVEL) * 72)
+    radius = 0.4 * unit  # в пунктах
+
+    fig = Figure(figsize=(width, height))
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_axis_off()
+    if live.any():
+        offsets = np.column_stack([xs, ys])[live]
+        rows = np.flatnonzero(live)
+        parents = layout.parent[rows]
+        edges = parents != rows
+        segments = np.stack([np.column_stack([xs, ys])[parents[edges]], offsets[edges]], axis=1)
+        ax.add_collection(LineCollection(segments, colors='k', linewidths=min(1, unit / 20), zorder=1))
+        ax.scatter(offsets[:, 0], offsets[:, 1], s=(2 * radius) ** 2, c=NODE_COLOR, zorder=2)
+        if len(rows) <= MAX_LABELS:
+            fontsize = min(9, unit * 0.3)
+            for uid, row in zip(layout.uids[rows].tolist(), rows.tolist()):
+                node = layout.nodes[uid]
+                label = str(node.val) if node.count == 1 else f"{node.val}×{node.count}"
+                ax.text(xs[row], ys[row], label, ha='center', va='center',
+                        fontsize=fontsize, fontweight='bold', zorder=3)
+        # Поля не меньше радиуса узла, чтобы крайние узлы и корень не обрезались
+        pad_x = max(0.5, radius * span / (width * 72))
+        pad_y = max(0.5, radius * levels / (height * 72))
+        ax.set_xlim(np.nanmin(xs) - pad_x, np.nanmax(xs) + pad_x)
+        ax.set_ylim(np.nanmin(ys) - pad_y, pad_y)
+    fig.savefig(path, dpi=dpi)
+    return path
+
+
+def _export_worker(payload, path, dpi):
+    return _render(_deserialize(payload), path, dpi)
+
+
+def _named_trees(trees):
+    # Список деревьев, словарь имя -> дерево или TreeManager
+    trees = getattr(trees, 'trees', trees)
+    if isinstance(trees, dict):
+        return list(trees.items())
+    return list(enumerate(trees, 1))
+
+
+# Отрисовка деревьев в файлы directory/prefix_имя.fmt. Деревья уходят в процессы в
+# компактном виде, раскладка и отрисовка идут параллельно. Возвращает пути в порядке деревьев
+def export_trees(trees, directory='.', fmt='png', workers=None, prefix='tree', dpi=100):
+    named = _named_trees(trees)
+    os.makedirs(directory, exist_ok=True)
+    paths = [os.path.join(directory, f"{prefix}_{name}.{fmt}") for name, _ in named]
+    # Даже без процессов рисуется копия: раскладка включает учёт изменений у своего дерева
+    payloads = [_serialize(tree) for _, tree in named]
+    if workers == 1 or len(named) <= 1:
+        return [_export_worker(payload, path, dpi) for payload, path in zip(payloads, paths)]
+    # Процессы запускаются заново, а не через fork: экспорт вызывается и из потока интерфейса,
+    # а fork многопоточного процесса с загруженным Tk может зависнуть. Воркерам нужны только буферы
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return list(pool.map(_export_worker, payloads, paths, [dpi] * len(paths)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Отрисовка деревьев из файлов AVLTree.save в PNG/SVG")
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('-o', '--output', default='.', help="каталог для картинок")
+    parser.add_argument('--format', choices=['png', 'svg', 'pdf'], default='png')
+    parser.add_argument('--workers', type=int, help="число процессов (по умолчанию по числу ядер)")
+    parser.add_argument('--dpi', type=int, default=100)
+    args = parser.parse_args()
+
+    trees = {os.path.splitext(os.path.basename(path))[0]: AVLTree.load(path) for path in args.files}
+    for path in export_trees(trees, args.output, args.format, args.workers, prefix='tree', dpi=args.dpi):
+        print(path)
+    sys.exit(0)
@@ -0,0 +1,161 @@
+import argparse
+import sys
+import time
+from collections import defaultdict
+
+from main import AVLTree
+
+
+# Пакетный режим без интерфейса: поток операций над именованными деревьями, как в
+# TreeManager, по строке на операцию «операция дерево аргументы». Строки трасс
+# workload.py («insert main 5») подходят без изменений. Пустые строки и # - комментарии.
+# Дерево заводят только insert и new, остальные операции над неизвестным деревом - ошибка.
+#
+#   insert T v | delete T v | search T v | count T
+#   new T [высота]              случайное дерево, как кнопка «Новое дерево»
+#   split T v [L R]             T делится на L и R (по умолчанию T_left и T_right), T закрывается
+#   merge A B [C]               A и B сливаются в C (по умолчанию A)
+#   traverse T pre|in|post
+class Session:
+    def __init__(self, multiset=False, out=None):
+        self.trees = {}
+        self.multiset = multiset
+        self.out = out
+        self.timings = defaultdict(lambda: [0, 0.0])  # операция -> [число, секунды]
+
+    def tree(self, name, create=True):
+        tree = self.trees.get(name)
+        if tree is None:
+            if not create:
+                raise KeyError(f"нет дерева {name}")
+            tree = self.trees[name] = AVLTree(self.multiset)
+        return tree
+
+    def _emit(self, text):
+        if self.out is not None:
+            self.out.write(text + "\n")
+
+    def _insert(self, name, val):
+        self.tree(name).insert(int(val))
+
+    def _delete(self, name, val):
+        self.tree(name, create=False).delete(int(val))
+
+    def _search(self, name, val):
+        self._emit(f"search {name} {val} {self.tree(name, create=False).search_count(int(val))}")
+
+    def _count(self, name):
+        self._emit(f"count {name} {len(self.tree(name, create=False))}")
+
+    def _new(self, name, height='3'):
+        tree = self.trees[name] = AVLTree(self.multiset)
+        tree.generate_random_tree(target_height=int(height))
+
+    def _split(self, name, val, left=None, right=None):
+        halves = self.tree(name, create=False).split(int(val))
+        del self.trees[name]
+        self.trees[left or f"{name}_left"], self.trees[right or f"{name}_right"] = halves
+
+    def _merge(self, first, second, target=None):
+        merged = AVLTree.merge(self.tree(first, create=False), self.tree(second, create=False))
+        del self.trees[first], self.trees[second]
+        self.trees[target or first] = merged
+
+    def _traverse(self, name, order='in'):
+        tree = self.tree(name, create=False)
+        nodes = {'pre': tree.iter_preorder, 'in': tree.iter_inorder, 'post': tree.iter_postorder}[order]()
+        self._emit(f"{name}: " + " ".join(str(node.val) for node in nodes))
+
+    OPERATIONS = {
+        'insert': _insert,
+        'delete': _delete,
+        'search': _search,
+        'count': _count,
+        'new': _new,
+        'split': _split,
+        'merge': _merge,
+        'traverse': _traverse,
+    }
+
+    def run(self, lines):
+        operations, timings, clock = self.OPERATIONS, self.timings, time.perf_counter
+        for number, line in enumerate(lines, 1):
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            op = operations.get(fields[0])
+            if op is None:
+                raise ValueError(f"строка {number}: неизвестная операция {fields[0]}")
+            started = clock()
+            try:
+                op(self, *fields[1:])
+            except (TypeError, ValueError, KeyError) as error:
+                # У KeyError str() добавляет кавычки, текст берётся из аргумента
+                reason = error.args[0] if isinstance(error, KeyError) else error
+                raise ValueError(f"строка {number}: {line.strip()}: {reason}") from error
+            entry = timings[fields[0]]
+            entry[0] += 1
+            entry[1] += clock() - started
+
+    def summary(self):
+        return {op: {'count': count, 'seconds': seconds} for op, (count, seconds) in self.timings.items()}
+
+
+def _print_summary(session, elapsed, stream):
+    total = 0
+    for op, data in sorted(session.summary().items()):
+        total += data['count']
+        print(f"{op:>9} {data['count']:>10} оп. {data['seconds']:9.3f} с "
+              f"{data['seconds'] * 1e6 / data['count']:9.2f} мкс/оп", file=stream)
+    print(f"{'всего':>9} {total:>10} оп. {elapsed:9.3f} с "
+          f"{total / elapsed if elapsed else 0:12.0f} оп/с", file=stream)
+    for name, tree in session.trees.items():
+        print(f"{'дерево':>9} {name}: {len(tree)} элементов, высота {tree.get_height(tree.root)}", file=stream)
+
+
+def _named_path(text):
+    name, sep, path = text.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError("ожидается ИМЯ=ФАЙЛ")
+    return name, path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Операции над AVL-деревьями без интерфейса")
+    parser.add_argument('files', nargs='*', default=['-'], help="файлы операций, - для stdin")
+    parser.add_argument('--multiset', action='store_true', help="новые деревья - мультимножества")
+    parser.add_argument('--load', type=_named_path, action='append', default=[], metavar='ИМЯ=ФАЙЛ',
+                        help="загрузить дерево из двоичного файла AVLTree.save")
+    parser.add_argument('--save', type=_named_path, action='append', default=[], metavar='ИМЯ=ФАЙЛ',
+                        help="сохранить дерево после выполнения")
+    parser.add_argument('-q', '--quiet', action='store_true', help="не печатать результаты операций")
+    args = parser.parse_args(argv)
+
+    session = Session(args.multiset, None if args.quiet else sys.stdout)
+    for name, path in args.load:
+        session.trees[name] = AVLTree.load(path)
+
+    started = time.perf_counter()
+    try:
+        for path in args.files:
+            if path == '-':
+                session.run(sys.stdin)
+            else:
+                with open(path, encoding='utf-8') as f:
+                    session.run(f)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+    elapsed = time.perf_counter() - started
+
+    for name, path in args.save:
+        if name not in session.trees:
+            print(f"--save {name}={path}: нет дерева {name}", file=sys.stderr)
+            return 2
+        session.trees[name].save(path)
+    _print_summary(session, elapsed, sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
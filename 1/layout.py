@@ -0,0 +1,203 @@
+import numpy as np
+
+SEPARATION = 1.0  # наименьшее расстояние между соседними узлами одного уровня
+LEVEL = 1.0       # расстояние между уровнями
+
+
+# Раскладка Рейнгольда-Тилфорда для двоичного дерева за O(n) с кэшем по uid узлов.
+#
+# Для каждого поддерева хранятся левый и правый контуры - крайние x на каждой глубине
+# относительно корня поддерева. Контур - цепочка неизменяемых ячеек (dx, следующая),
+# dx отсчитывается от предыдущей глубины. Родитель раздвигает детей, проходя контуры
+# на глубину меньшего поддерева, и копирует столько же ячеек, а хвост более высокого
+# поддерева переиспользует. Поэтому контуры детей не меняются и остаются в кэше, а
+# суммарная работа, как и в исходном алгоритме, линейна.
+#
+# Дерево сообщает изменённые узлы (AVLTree.track_changes); пересчитываются только они,
+# остальные поддеревья берут контуры из кэша. Абсолютные координаты собираются из смещений
+# относительно родителя векторно, удвоением указателей по массиву родителей.
+# Координаты лежат в массивах xs, ys, строка узла - index[uid]
+class LayoutCache:
+    def __init__(self):
+        self._tree = None
+        self._reset()
+
+    def _reset(self):
+        self.index = {}     # uid -> строка в массивах
+        self.nodes = {}     # uid -> узел, по которому считалась раскладка
+        self.children = {}  # uid -> (uid левого, uid правого)
+        self.contours = {}  # uid -> (левый контур, правый контур)
+        self.root = None
+        self._free = []
+        self.uids = np.zeros(0, dtype=np.int64)
+        self.parent = np.zeros(0, dtype=np.int64)
+        self._rel = np.zeros((0, 2))
+        self.xs = np.zeros(0)
+        self.ys = np.zeros(0)
+
+    # Возвращает (изменённые uid, удалённые uid). Изменённые - новые и пересчитанные узлы,
+    # а также сдвинувшиеся вместе с соседями
+    def update(self, tree):
+        if tree is not self._tree:
+            tree.track_changes()
+            tree.pop_changes()
+            self._tree = tree
+            self._reset()
+            return self._refresh(tree.root, None)
+        return self._refresh(tree.root, tree.pop_changes())
+
+    # Координаты живых узлов: uid, x, y
+    def coordinates(self):
+        live = self.uids >= 0
+        return self.uids[live], self.xs[live], self.ys[live]
+
+    def _row(self, uid):
+        row = self.index.get(uid)
+        if row is None:
+            if not self._free:
+                old = len(self.uids)
+                new = max(16, 2 * old)
+                self.uids = np.concatenate([self.uids, np.full(new - old, -1, dtype=np.int64)])
+                self.parent = np.concatenate([self.parent, np.arange(old, new)])
+                self._rel = np.concatenate([self._rel, np.full((new - old, 2), np.nan)])
+                self.xs = np.concatenate([self.xs, np.full(new - old, np.nan)])
+                self.ys = np.concatenate([self.ys, np.full(new - old, np.nan)])
+                self._free.extend(range(new - 1, old - 1, -1))
+            row = self.index[uid] = self._free.pop()
+            self.uids[row] = uid
+        return row
+
+    def _refresh(self, root, dirty):
+        changed, reached, candidates = set(), set(), []
+        if self.root is not None and (root is None or root.uid != self.root):
+            candidates.append(self.root)
+        self.root = root.uid if root else None
+
+        # Пересчёт контуров снизу вверх, только для изменённых и ещё не виденных узлов
+        stack = [(root, False)] if root else []
+        while stack:
+            node, ready = stack.pop()
+            uid = node.uid
+            if not ready:
+                reached.add(uid)
+                if dirty is not None and uid not in dirty and uid in self.contours:
+                    continue
+                stack.append((node, True))
+                for child in (node.left, node.right):
+                    if child:
+                        stack.append((child, False))
+                continue
+            candidates.extend(self.children.get(uid, ()))
+            self._place(node)
+            changed.add(uid)
+        if root:
+            row = self._row(root.uid)
+            self.parent[row] = row
+            self._rel[row] = 0.0
+
+        # Бывшие потомки пересчитанных узлов, до которых обход не дошёл, удалены из дерева
+        removed = set()
+        while candidates:
+            uid = candidates.pop()
+            if uid is None or uid in reached or uid in removed or uid not in self.index:
+                continue
+            removed.add(uid)
+            candidates.extend(self.children[uid])
+            row = self.index.pop(uid)
+            del self.nodes[uid], self.children[uid], self.contours[uid]
+            self.uids[row] = -1
+            self.parent[row] = row
+            self._rel[row] = np.nan
+            self._free.append(row)
+
+        xs, ys = self._absolute(root.height if root else 0)
+        moved = ~((xs == self.xs) & (ys == self.ys))
+        moved &= self.uids >= 0
+        changed.update(self.uids[moved].tolist())
+        self.xs, self.ys = xs, ys
+        return changed, removed
+
+    # Контуры узла из контуров детей и смещения детей относительно узла
+    def _place(self, node):
+        uid = node.uid
+        left, right = node.left, node.right
+        self.nodes[uid] = node
+        self.children[uid] = (left.uid if left else None, right.uid if right else None)
+        row = self._row(uid)
+        if not left and not right:
+            leaf = (0.0, None)
+            self.contours[uid] = (leaf, leaf)
+            return
+
+        if left and right:
+            left_contours, right_contours = self.contours[left.uid], self.contours[right.uid]
+            # Раздвигаем детей так, чтобы на каждой общей глубине правый край левого
+            # поддерева был левее левого края правого хотя бы на SEPARATION
+            a, b = left_contours[1], right_contours[0]
+            xa = xb = 0.0
+            gap = SEPARATION
+            for _ in range(min(left.height, right.height) - 1):
+                a, b = a[1], b[1]
+                xa += a[0]
+                xb += b[0]
+                gap = max(gap, xa - xb + SEPARATION)
+            off_left, off_right = -gap / 2, gap / 2
+            outer_left = self._outer(left_contours[0], off_left, left.height,
+                                     right_contours[0], off_right, right.height)
+            outer_right = self._outer(right_contours[1], off_right, right.height,
+                                      left_contours[1], off_left, left.height)
+        elif left:
+            off_left = -SEPARATION / 2
+            left_contours = self.contours[left.uid]
+            outer_left = (off_left, left_contours[0][1])
+            outer_right = (off_left, left_contours[1][1])
+        else:
+            off_right = SEPARATION / 2
+            right_contours = self.contours[right.uid]
+            outer_left = (off_right, right_contours[0][1])
+            outer_right = (off_right, right_contours[1][1])
+
+        self.contours[uid] = ((0.0, outer_left), (0.0, outer_right))
+        for child, off in ((left, off_left if left else 0.0), (right, off_right if right else 0.0)):
+            if child:
+                child_row = self._row(child.uid)
+                self.parent[child_row] = row
+                self._rel[child_row] = off, -LEVEL
+
+    # Внешний контур со стороны ребёнка near (с глубины 1 относительно родителя).
+    # Пока near не кончился, контур идёт по нему; ниже продолжается контуром ребёнка far
+    @staticmethod
+    def _outer(near, near_off, near_height, far, far_off, far_height):
+        if near_height >= far_height:
+            return near_off, near[1]
+        dxs = [near_off]
+        x = 0.0
+        for _ in range(near_height - 1):
+            near = near[1]
+            x += near[0]
+            dxs.append(near[0])
+        near_x = x + near_off
+        x = 0.0
+        for _ in range(near_height):
+            far = far[1]
+            x += far[0]
+        cell = (x + far_off - near_x, far[1])
+        for dx in reversed(dxs):
+            cell = (dx, cell)
+        return cell
+
+    # Абсолютные координаты: каждый шаг прибавляет к смещению строки смещение её
+    # текущего предка и перескакивает к предку предка, log2(высоты) шагов
+    def _absolute(self, height):
+        rel, parent = self._rel.copy(), self.parent
+        for _ in range(max(height - 1, 0).bit_length()):
+            rel += rel[parent]
+            parent = parent[parent]
+        return rel[:, 0], rel[:, 1]
+
+
+# Разовая раскладка без учёта изменений: uid, x, y
+def tidy_layout(root):
+    layout = LayoutCache()
+    layout._refresh(root, None)
+    return layout.coordinates()
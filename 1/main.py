@@ -1,32 +1,203 @@
+import bisect
+import gc
+import heapq
+import io
+import itertools
+import math
+import mmap
 import random
+import struct
+import sys
+import time
+from array import array
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+
+# Узлы дерева не образуют циклов, поэтому при массовой сборке сборщик мусора
+# только тратит время, многократно обходя уже созданные узлы
+@contextmanager
+def _gc_paused():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
 
 
 class Node:
+    # Без __dict__ узел занимает в несколько раз меньше памяти
+    __slots__ = ('val', 'left', 'right', 'height', 'count', 'size', 'uid', 'epoch')
+
     def __init__(self, val, left=None, right=None, uid=None):
         self.val = val
         self.left = left
         self.right = right
         self.height = 1
+        self.count = 1  # кратность ключа в режиме мультимножества
+        self.size = 1  # число ключей в поддереве с учётом кратностей
         self.uid = uid
+        self.epoch = 0  # эпоха дерева, которому узел принадлежит и может меняться на месте
 
 
-class AVLTree:
+# Счётчики горячих путей дерева; включаются через AVLTree.enable_stats()
+class TreeStats:
     def __init__(self):
+        self.rotations = Counter()
+        self.depths = defaultdict(Counter)
+        self.timings = defaultdict(lambda: [0, 0.0, 0.0])  # вызовы, суммарное и худшее время
+        self.allocations = 0
+        self.copies = 0  # копии узлов при записи после снимка
+
+    def record_depth(self, op, depth):
+        self.depths[op][depth] += 1
+
+    def timed(self, op, method):
+        def _timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                entry = self.timings[op]
+                entry[0] += 1
+                entry[1] += elapsed
+                entry[2] = max(entry[2], elapsed)
+        return _timed
+
+    def as_dict(self, tree=None):
+        data = {
+            'rotations': dict(self.rotations),
+            'depths': {op: dict(sorted(histogram.items())) for op, histogram in self.depths.items()},
+            'timings': {op: {'calls': calls, 'total_seconds': total, 'max_seconds': worst,
+                             'mean_seconds': total / calls if calls else 0.0}
+                        for op, (calls, total, worst) in self.timings.items()},
+            'allocations': self.allocations,
+            'copies': self.copies,
+        }
+        if tree is not None:
+            size = len(tree)
+            height = tree.get_height(tree.root)
+            # Высота AVL-дерева не превышает примерно 1.44 * log2(n + 2)
+            bound = 1.4405 * math.log2(size + 2) - 0.3277
+            data['tree'] = {'size': size, 'height': height, 'height_bound': bound,
+                            'height_to_log2': height / math.log2(size + 1) if size else 0.0}
+        return data
+
+
+class AVLTree:
+    # uid общий для всех деревьев: после split/merge узлы переходят между деревьями
+    _uids = itertools.count(1)
+    _epochs = itertools.count(1)
+
+    def __init__(self, multiset=False):
         self.node_id_counter = 0
         self.root = None
+        # В режиме мультимножества равные ключи хранятся одним узлом со счётчиком
+        self.multiset = multiset
+        self.epoch = next(AVLTree._epochs)
+        self.stats = None
+        # uid узлов, изменённых с последнего pop_changes(); None - учёт выключен
+        self.changes = None
+
+    # Операции, время которых замеряется при включённой статистике
+    _TIMED = ('insert', 'delete', 'search_count', 'count_range', 'rank', 'select',
+              'insert_many', 'delete_many', 'split')
+
+    # Замеры времени подменяют методы экземпляра обёртками, поэтому
+    # без статистики остаётся только проверка self.stats на вращениях и выделениях
+    def enable_stats(self) -> TreeStats:
+        if self.stats is None:
+            self.stats = TreeStats()
+            for name in self._TIMED:
+                setattr(self, name, self.stats.timed(name, getattr(self, name)))
+        return self.stats
+
+    def disable_stats(self):
+        if self.stats is not None:
+            for name in self._TIMED:
+                delattr(self, name)
+            self.stats = None
+
+    def stats_snapshot(self):
+        return self.stats.as_dict(self) if self.stats is not None else None
+
+    # Учёт изменений для инкрементальной отрисовки. Любое изменение пересчитывает
+    # высоту и размер на всём пути до корня, поэтому вместе с узлом помечаются и все его предки
+    def track_changes(self):
+        if self.changes is None:
+            self.changes = set()
+
+    def pop_changes(self):
+        changes = self.changes
+        if changes is not None:
+            self.changes = set()
+        return changes
+
+    def _new_node(self, val) -> Node:
+        self.node_id_counter += 1
+        if self.stats is not None:
+            self.stats.allocations += 1
+        node = Node(val, uid=next(AVLTree._uids))
+        node.epoch = self.epoch
+        if self.changes is not None:
+            self.changes.add(node.uid)
+        return node
+
+    # Копирование при записи: узлы чужой эпохи (общие со снимком или другим деревом)
+    # перед изменением копируются, поэтому меняется только путь O(log n)
+    def _own(self, node: Node) -> Node:
+        if node.epoch == self.epoch:
+            return node
+        if self.stats is not None:
+            self.stats.copies += 1
+        copy = Node(node.val, node.left, node.right, uid=node.uid)
+        copy.height, copy.count, copy.size = node.height, node.count, node.size
+        copy.epoch = self.epoch
+        return copy
+
+    # После смены эпохи все текущие узлы дерева становятся неизменяемыми
+    def _freeze(self):
+        self.epoch = next(AVLTree._epochs)
+
+    # Снимок за O(1): новые изменения дерева копируют затронутые пути и не видны в снимке
+    def snapshot(self):
+        snap = AVLSnapshot(self)
+        self._freeze()
+        return snap
+
+    # Копия за O(1): узлы общие, изменения любой из копий копируют свой путь
+    def copy(self):
+        twin = AVLTree(self.multiset)
+        twin.root = self.root
+        self._freeze()
+        return twin
 
     def get_height(self, node: Node) -> int:
         return node.height if node else 0
 
+    def get_size(self, node: Node) -> int:
+        return node.size if node else 0
+
     def update_height(self, node: Node):
         if node:
             node.height = 1 + max(self.get_height(node.left), self.get_height(node.right))
+            node.size = node.count + self.get_size(node.left) + self.get_size(node.right)
+            if self.changes is not None:
+                self.changes.add(node.uid)
+
+    def __len__(self):
+        return self.get_size(self.root)
 
     def get_balance(self, node: Node) -> int:
         return self.get_height(node.left) - self.get_height(node.right) if node else 0
 
     def rotate_right(self, y: Node) -> Node:
-        x = y.left
+        y = self._own(y)
+        x = self._own(y.left)
         T2 = x.right
 
         x.right = y
@@ -37,7 +208,8 @@ class AVLTree:
         return x
 
     def rotate_left(self, x: Node) -> Node:
-        y = x.right
+        x = self._own(x)
+        y = self._own(x.right)
         T2 = y.left
 
         y.left = x
@@ -47,160 +219,796 @@ class AVLTree:
         self.update_height(y)
         return y
 
+    # node должен принадлежать дереву (см. _own)
     def rebalance(self, node: Node) -> Node:
         balance = self.get_balance(node)
 
         if balance > 1:
             if self.get_balance(node.left) >= 0:
+                self._rotated('right')
                 return self.rotate_right(node)
             else:
+                self._rotated('left-right')
                 node.left = self.rotate_left(node.left)
                 return self.rotate_right(node)
 
         if balance < -1:
             if self.get_balance(node.right) <= 0:
+                self._rotated('left')
                 return self.rotate_left(node)
             else:
+                self._rotated('right-left')
                 node.right = self.rotate_right(node.right)
                 return self.rotate_left(node)
 
         return node
 
-    def insert(self, val: int) -> None:
-        def _insert(node: Node) -> Node:
-            if not node:
-                self.node_id_counter += 1
-                return Node(val, uid=self.node_id_counter)
-            if val < node.val:
-                node.left = _insert(node.left)
+    def _rotated(self, kind):
+        if self.stats is not None:
+            self.stats.rotations[kind] += 1
+
+    # Подъём от места изменения к корню: path - список (узел, ушли_влево)
+    def _retrace(self, path, child: Node) -> Node:
+        for node, went_left in reversed(path):
+            if node.epoch != self.epoch:
+                node = self._own(node)
+            if went_left:
+                node.left = child
             else:
-                node.right = _insert(node.right)
-
+                node.right = child
             self.update_height(node)
-            return self.rebalance(node)
+            child = self.rebalance(node)
+        return child
 
-        self.root = _insert(self.root)
+    def insert(self, val: int) -> None:
+        path = []
+        node = self.root
+        while node:
+            if self.multiset and val == node.val:
+                break
+            went_left = val < node.val
+            path.append((node, went_left))
+            node = node.left if went_left else node.right
+        if self.stats is not None:
+            self.stats.record_depth('insert', len(path))
+        if node:
+            node = self._own(node)
+            node.count += 1
+            self.update_height(node)
+            self.root = self._retrace(path, node)
+            return
+        self.root = self._retrace(path, self._new_node(val))
 
     def delete(self, val: int) -> None:
-        def _delete(node: Node) -> Node:
-            if not node:
-                return node
-            if val < node.val:
-                node.left = _delete(node.left)
-            elif val > node.val:
-                node.right = _delete(node.right)
-            else:
-                if not node.left:
-                    return node.right
-                elif not node.right:
-                    return node.left
-                temp = self._find_min(node.right)
-                node.val = temp.val
-                node.right = _delete(node.right)
-
+        path = []
+        node = self.root
+        while node and node.val != val:
+            went_left = val < node.val
+            path.append((node, went_left))
+            node = node.left if went_left else node.right
+        if self.stats is not None:
+            self.stats.record_depth('delete', len(path))
+        if not node:
+            return
+        node = self._own(node)
+        if node.count > 1:
+            node.count -= 1
             self.update_height(node)
-            return self.rebalance(node)
-
-        self.root = _delete(self.root)
+            self.root = self._retrace(path, node)
+            return
+        if node.left and node.right:
+            # Переносим значение преемника и удаляем сам преемник
+            path.append((node, False))
+            successor = node.right
+            while successor.left:
+                path.append((successor, True))
+                successor = successor.left
+            node.val, node.count = successor.val, successor.count
+            node = successor
+        self.root = self._retrace(path, node.left or node.right)
+
+    # Обход узлов поддерева по возрастанию без рекурсии
+    def _iter_nodes(self, node: Node):
+        stack = []
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node
+            node = node.right
 
     def _find_min(self, node: Node) -> Node:
         while node.left:
             node = node.left
         return node
 
-    def search_count(self, value):
-        def _search(node):
-            if not node:
-                return 0
-            return (1 if node.val == value else 0) + _search(node.left) + _search(node.right)
+    def _find_max(self, node: Node) -> Node:
+        while node.right:
+            node = node.right
+        return node
 
-        return _search(self.root)
+    # Порядковые статистики по размерам поддеревьев, O(log n)
+    def _rank(self, value, inclusive=False) -> int:
+        return self._rank_in(self.root, value, inclusive)
 
-    # Обходы дерева
-    def preorder_traversal(self):
-        result = []
+    def _rank_in(self, node: Node, value, inclusive=False) -> int:
+        rank = 0
+        while node:
+            if node.val < value or (inclusive and node.val == value):
+                rank += self.get_size(node.left) + node.count
+                node = node.right
+            else:
+                node = node.left
+        return rank
+
+    # Сколько ключей строго меньше value
+    def rank(self, value) -> int:
+        return self._rank(value)
+
+    # k-й по возрастанию ключ, нумерация с нуля
+    def select(self, k: int):
+        if not 0 <= k < len(self):
+            raise IndexError("Индекс вне дерева")
+        return self._select_in(self.root, k)
+
+    def _select_in(self, node: Node, k: int):
+        while True:
+            left_size = self.get_size(node.left)
+            if k < left_size:
+                node = node.left
+            elif k < left_size + node.count:
+                return node.val
+            else:
+                k -= left_size + node.count
+                node = node.right
+
+    # Сколько ключей в отрезке [lo, hi]
+    def count_range(self, lo, hi) -> int:
+        if hi < lo:
+            return 0
+        return self._rank(hi, inclusive=True) - self._rank(lo)
 
-        def _preorder(node):
+    def search_count(self, value):
+        if self.stats is not None:
+            self.stats.record_depth('search', self._search_depth(value))
+        return self._rank(value, inclusive=True) - self._rank(value)
+
+    # Сколько узлов проходит поиск до первого равного ключа
+    def _search_depth(self, value) -> int:
+        depth = 0
+        node = self.root
+        while node and node.val != value:
+            depth += 1
+            node = node.left if value < node.val else node.right
+        return depth
+
+    # Ближайшие ключи; None, если такого ключа нет
+    def _bound(self, value, inclusive: bool, above: bool):
+        found = None
+        node = self.root
+        while node:
+            if above:
+                fits = value < node.val or (inclusive and node.val == value)
+            else:
+                fits = node.val < value or (inclusive and node.val == value)
+            if fits:
+                found = node
+                node = node.left if above else node.right
+            else:
+                node = node.right if above else node.left
+        return found.val if found else None
+
+    # Наименьший ключ >= value
+    def lower_bound(self, value):
+        return self._bound(value, inclusive=True, above=True)
+
+    # Наименьший ключ > value
+    def upper_bound(self, value):
+        return self._bound(value, inclusive=False, above=True)
+
+    def ceiling(self, value):
+        return self.lower_bound(value)
+
+    # Наибольший ключ <= value
+    def floor(self, value):
+        return self._bound(value, inclusive=True, above=False)
+
+    # Ключи из отрезка [lo, hi] по возрастанию (или убыванию): спуск O(log n), затем O(1) на ключ.
+    # Граница None означает отсутствие ограничения
+    def irange(self, lo=None, hi=None, reverse=False):
+        start, stop = (hi, lo) if reverse else (lo, hi)
+        stack = []
+
+        def _push(node):
+            while node:
+                if start is not None and (start < node.val if reverse else node.val < start):
+                    node = node.left if reverse else node.right
+                else:
+                    stack.append(node)
+                    node = node.right if reverse else node.left
+
+        _push(self.root)
+        while stack:
+            node = stack.pop()
+            if stop is not None and (node.val < stop if reverse else stop < node.val):
+                return
+            for _ in range(node.count):
+                yield node.val
+            _push(node.left if reverse else node.right)
+
+    # Ленивые обходы: память O(высоты), узлы отдаются по одному
+    def iter_preorder(self):
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            yield node
+            if node.right:
+                stack.append(node.right)
+            if node.left:
+                stack.append(node.left)
+
+    def iter_inorder(self):
+        return self._iter_nodes(self.root)
+
+    def iter_postorder(self):
+        stack = []
+        node = self.root
+        last = None
+        while stack or node:
             if node:
-                result.append(node)
-                _preorder(node.left)
-                _preorder(node.right)
+                stack.append(node)
+                node = node.left
+                continue
+            top = stack[-1]
+            if top.right and top.right is not last:
+                node = top.right
+            else:
+                last = stack.pop()
+                yield last
 
-        _preorder(self.root)
-        return result
+    # Обходы дерева
+    def preorder_traversal(self):
+        return list(self.iter_preorder())
 
     def inorder_traversal(self):
-        result = []
-
-        def _inorder(node):
-            if node:
-                _inorder(node.left)
-                result.append(node)
-                _inorder(node.right)
-
-        _inorder(self.root)
-        return result
+        return list(self.iter_inorder())
 
     def postorder_traversal(self):
-        result = []
+        return list(self.iter_postorder())
+
+    # Склейка: все ключи left <= node.val <= все ключи right.
+    # Узлы переиспользуются, балансировка идёт только вдоль края более высокого дерева
+    def _join(self, left: Node, node: Node, right: Node) -> Node:
+        node = self._own(node)
+        hl, hr = self.get_height(left), self.get_height(right)
+        if hl > hr + 1:
+            return self._join_right(left, node, right)
+        if hr > hl + 1:
+            return self._join_left(left, node, right)
+        node.left, node.right = left, right
+        self.update_height(node)
+        return node
 
-        def _postorder(node):
-            if node:
-                _postorder(node.left)
-                _postorder(node.right)
-                result.append(node)
+    def _join_right(self, left: Node, node: Node, right: Node) -> Node:
+        left = self._own(left)
+        if self.get_height(left.right) <= self.get_height(right) + 1:
+            node.left, node.right = left.right, right
+            self.update_height(node)
+            left.right = node
+        else:
+            left.right = self._join_right(left.right, node, right)
+        self.update_height(left)
+        return self.rebalance(left)
+
+    def _join_left(self, left: Node, node: Node, right: Node) -> Node:
+        right = self._own(right)
+        if self.get_height(right.left) <= self.get_height(left) + 1:
+            node.left, node.right = left, right.left
+            self.update_height(node)
+            right.left = node
+        else:
+            right.left = self._join_left(left, node, right.left)
+        self.update_height(right)
+        return self.rebalance(right)
+
+    # Склейка без разделителя: максимум левого дерева становится корнем склейки
+    def _join2(self, left: Node, right: Node) -> Node:
+        if not left:
+            return right
+        if not right:
+            return left
+        rest, last = self._split_last(left)
+        return self._join(rest, last, right)
+
+    def _split_first(self, node: Node):
+        if not node.left:
+            return node.right, node
+        rest, first = self._split_first(node.left)
+        return self._join(rest, node, node.right), first
+
+    def _split_last(self, node: Node):
+        if not node.right:
+            return node.left, node
+        rest, last = self._split_last(node.right)
+        return self._join(node.left, node, rest), last
+
+    # Разрезание по ключу: слева всё < value, справа всё >= value.
+    # С inclusive=True равные value ключи уходят влево
+    def _split(self, node: Node, value, inclusive=False):
+        if not node:
+            return None, None
+        if node.val < value or (inclusive and node.val == value):
+            left, right = self._split(node.right, value, inclusive)
+            return self._join(node.left, node, left), right
+        left, right = self._split(node.left, value, inclusive)
+        return left, self._join(right, node, node.right)
+
+    # Разрезание на три части: < value, == value, > value.
+    # Равные ключи снимаются с начала правой части по одному: обычно их нет или мало
+    def _split3(self, node: Node, value):
+        less, greater = self._split(node, value)
+        equal = None
+        while greater and self._find_min(greater).val == value:
+            greater, first = self._split_first(greater)
+            equal = self._join2(equal, self._join(None, first, None))
+        return less, equal, greater
+
+    # Объединение с сохранением дубликатов, O(m log(n/m + 1))
+    def _union(self, a: Node, b: Node) -> Node:
+        if not a:
+            return b
+        if not b:
+            return a
+        left, right = self._split(b, a.val)
+        if self.multiset and right and self._find_min(right).val == a.val:
+            right, first = self._split_first(right)
+            a = self._own(a)
+            a.count += first.count
+        a_left, a_right = a.left, a.right
+        return self._join(self._union(a_left, left), a, self._union(a_right, right))
+
+    # Сборка идеально сбалансированного дерева из n узлов, идущих по возрастанию, за O(n)
+    def _build(self, nodes, n: int) -> Node:
+        if n == 0:
+            return None
+        left = self._build(nodes, n // 2)
+        node = self._own(next(nodes))
+        node.left = left
+        node.right = self._build(nodes, n - n // 2 - 1)
+        self.update_height(node)
+        return node
 
-        _postorder(self.root)
-        return result
+    def _build_sorted(self, values) -> Node:
+        def _nodes():
+            node = None
+            for val in values:
+                if node is not None and val < node.val:
+                    raise ValueError("Значения должны идти по неубыванию")
+                if self.multiset and node is not None and val == node.val:
+                    node.count += 1
+                    continue
+                if node is not None:
+                    yield node
+                node = self._new_node(val)
+            if node is not None:
+                yield node
+
+        if self.multiset:
+            nodes = list(_nodes())
+            return self._build(iter(nodes), len(nodes))
+        return self._build(_nodes(), len(values))
+
+    @classmethod
+    def from_sorted(cls, iterable, multiset=False):
+        tree = cls(multiset)
+        values = iterable if isinstance(iterable, (list, tuple, range)) else list(iterable)
+        with _gc_paused():
+            tree.root = tree._build_sorted(values)
+        return tree
+
+    @classmethod
+    def from_iterable(cls, iterable, multiset=False):
+        return cls.from_sorted(sorted(iterable), multiset)
+
+    # Все ключи a не больше ключей b; в мультимножестве равные ключи нельзя склеить без слияния узлов
+    def _precedes(self, a: Node, b: Node) -> bool:
+        last, first = self._find_max(a).val, self._find_min(b).val
+        return last < first or (not self.multiset and last == first)
+
+    # Разделение и слияние делят узлы с исходными деревьями: исходные замораживаются
+    # и остаются прежними, а результат копирует узлы только при изменении
+    @staticmethod
+    def join(left, key, right):
+        if left.multiset != right.multiset:
+            raise ValueError("Деревья должны быть в одном режиме")
+        if (left.root and left._find_max(left.root).val > key) or \
+                (right.root and right._find_min(right.root).val < key):
+            raise ValueError("Ключи левого дерева должны быть <= key <= ключей правого")
+        joined = AVLTree(left.multiset)
+        if joined.multiset and ((left.root and left._find_max(left.root).val == key) or
+                                (right.root and right._find_min(right.root).val == key)):
+            # Равный ключ уже есть: сливаем деревья и увеличиваем кратность
+            joined = AVLTree.merge(left, right)
+            joined.insert(key)
+            return joined
+        left._freeze()
+        right._freeze()
+        joined.root = joined._join(left.root, joined._new_node(key), right.root)
+        return joined
 
-    # Новые методы для разделения и слияния
     def split(self, value):
-        left_tree = AVLTree()
-        right_tree = AVLTree()
-
-        def _split(node):
-            if not node:
-                return
-            if node.val < value:
-                left_tree.insert(node.val)
-            else:
-                right_tree.insert(node.val)
-            _split(node.left)
-            _split(node.right)
-
-        _split(self.root)
+        left_tree = AVLTree(self.multiset)
+        right_tree = AVLTree(self.multiset)
+        self._freeze()
+        left_tree.root, right_tree.root = left_tree._split(self.root, value)
+        # Скопированные при разрезании узлы попали в обе половины, отдаём их обеим как общие
+        left_tree._freeze()
         return left_tree, right_tree
 
     @staticmethod #для определения статического метода в классе
     def merge(tree1, tree2):
-        merged = AVLTree()
+        if tree1 is tree2:
+            raise ValueError("Нельзя слить дерево само с собой")
+        if tree1.multiset != tree2.multiset:
+            raise ValueError("Деревья должны быть в одном режиме")
+        merged = AVLTree(tree1.multiset)
+        tree1._freeze()
+        tree2._freeze()
+        merged.root = merged._merge_nodes(tree1.root, tree2.root)
+        return merged
 
-        def _add_nodes(node):
-            if node:
-                merged.insert(node.val)
-                _add_nodes(node.left)
-                _add_nodes(node.right)
+    def _merge_nodes(self, a: Node, b: Node) -> Node:
+        if not a or not b:
+            return a or b
+        if self._precedes(a, b):
+            return self._join2(a, b)
+        if self._precedes(b, a):
+            return self._join2(b, a)
+        if 8 * min(a.size, b.size) >= max(a.size, b.size):
+            # Деревья сравнимого размера дешевле слить линейно и пересобрать из тех же узлов
+            nodes = []
+            for node in heapq.merge(self._iter_nodes(a), self._iter_nodes(b), key=lambda node: node.val):
+                if self.multiset and nodes and nodes[-1].val == node.val:
+                    nodes[-1].count += node.count
+                else:
+                    nodes.append(self._own(node))
+            return self._build(iter(nodes), len(nodes))
+        return self._union(a, b)
+
+    # Операции над множествами с кратностями: объединение складывает кратности,
+    # пересечение берёт меньшую, разность вычитает. Исходные деревья не меняются
+    @staticmethod
+    def union(tree1, tree2, workers=None):
+        return AVLTree._set_operation('union', tree1, tree2, workers)
+
+    @staticmethod
+    def intersection(tree1, tree2, workers=None):
+        return AVLTree._set_operation('intersection', tree1, tree2, workers)
+
+    @staticmethod
+    def difference(tree1, tree2, workers=None):
+        return AVLTree._set_operation('difference', tree1, tree2, workers)
+
+    # С какого размера имеет смысл раздавать куски процессам: пересылка стоит O(n)
+    PARALLEL_THRESHOLD = 1 << 18
+
+    @staticmethod
+    def _set_operation(op, tree1, tree2, workers):
+        if tree1 is tree2:
+            raise ValueError("Нужны два разных дерева")
+        if tree1.multiset != tree2.multiset:
+            raise ValueError("Деревья должны быть в одном режиме")
+        result = AVLTree(tree1.multiset)
+        tree1._freeze()
+        tree2._freeze()
+        if workers and max(len(tree1), len(tree2)) >= AVLTree.PARALLEL_THRESHOLD:
+            result.root = result._set_operation_parallel(op, tree1.root, tree2.root, workers)
+        else:
+            result.root = result._set_operation_nodes(op, tree1.root, tree2.root)
+        return result
 
-        _add_nodes(tree1.root)
-        _add_nodes(tree2.root)
-        return merged
+    def _set_operation_nodes(self, op, a: Node, b: Node) -> Node:
+        if op == 'union':
+            return self._merge_nodes(a, b)
+        if a and b and 8 * min(a.size, b.size) >= max(a.size, b.size):
+            return self._combine_linear(op, a, b)
+        return self._combine(op, a, b)
+
+    # Узлы поддерева, сгруппированные по равным ключам
+    def _runs(self, node: Node):
+        for key, run in itertools.groupby(self._iter_nodes(node), key=lambda node: node.val):
+            yield key, list(run)
+
+    # Для деревьев сравнимого размера: проход двумя указателями и пересборка за O(n + m)
+    def _combine_linear(self, op, a: Node, b: Node) -> Node:
+        nodes = []
+        others = self._runs(b)
+        other = next(others, None)
+        for key, run in self._runs(a):
+            while other is not None and other[0] < key:
+                other = next(others, None)
+            count = sum(node.count for node in run)
+            other_count = sum(node.count for node in other[1]) if other is not None and other[0] == key else 0
+            keep = min(count, other_count) if op == 'intersection' else max(0, count - other_count)
+            for node in run:
+                if not keep:
+                    break
+                node = self._own(node)
+                node.count = min(node.count, keep)
+                keep -= node.count
+                nodes.append(node)
+        return self._build(iter(nodes), len(nodes))
+
+    # Пересечение и разность по схеме «разрезать по корню a и склеить», O(m log(n/m + 1))
+    def _combine(self, op, a: Node, b: Node) -> Node:
+        if not a or not b:
+            return a if op == 'difference' else None
+        key = a.val
+        if self.multiset or not (a.left and self._find_max(a.left).val == key or
+                                 a.right and self._find_min(a.right).val == key):
+            # Равных корню ключей в поддеревьях нет, корень отделяется без разрезания
+            a_less, a_greater = a.left, a.right
+            a_equal = self._own(a)
+            a_equal.left = a_equal.right = None
+            self.update_height(a_equal)
+        else:
+            a_less, a_equal, a_greater = self._split3(a, key)
+        b_less, b_equal, b_greater = self._split3(b, key)
+        left = self._combine(op, a_less, b_less)
+        right = self._combine(op, a_greater, b_greater)
+        if op == 'intersection':
+            keep = min(self.get_size(a_equal), self.get_size(b_equal))
+        else:
+            keep = max(0, self.get_size(a_equal) - self.get_size(b_equal))
+        middle = self._keep_copies(a_equal, keep)
+        if middle and not middle.left and not middle.right:
+            return self._join(left, middle, right)
+        return self._join2(self._join2(left, middle), right)
+
+    # Оставляет keep копий из дерева равных ключей
+    def _keep_copies(self, equal: Node, keep: int) -> Node:
+        while equal and self.get_size(equal) > keep:
+            if equal.count > 1:
+                equal = self._own(equal)
+                equal.count = max(keep, 0)
+                if not equal.count:
+                    return None
+                self.update_height(equal)
+            else:
+                equal, _ = self._split_first(equal)
+        return equal
+
+    # Параллельный вариант: деревья режутся по квантилям большего на независимые
+    # диапазоны ключей, каждый диапазон пересылается процессу в двоичном формате save()
+    def _set_operation_parallel(self, op, a: Node, b: Node, workers: int) -> Node:
+        larger = a if self.get_size(a) >= self.get_size(b) else b
+        pivots = sorted({self._select_in(larger, larger.size * i // workers) for i in range(1, workers)})
+        chunks_a, chunks_b = self._cut(a, pivots), self._cut(b, pivots)
+        packed_a = [self._pack(chunk) for chunk in chunks_a]
+        packed_b = [self._pack(chunk) for chunk in chunks_b]
+        root = None
+        with ProcessPoolExecutor(workers) as pool:
+            for data in pool.map(_set_operation_worker, [op] * len(packed_a), packed_a, packed_b):
+                root = self._join2(root, AVLTree.read(io.BytesIO(data)).root)
+        return root
+
+    def _cut(self, node: Node, pivots):
+        chunks = []
+        for pivot in pivots:
+            chunk, node = self._split(node, pivot)
+            chunks.append(chunk)
+        chunks.append(node)
+        return chunks
+
+    def _pack(self, node: Node) -> bytes:
+        tree = AVLTree(self.multiset)
+        tree.root = node
+        buffer = io.BytesIO()
+        tree.dump(buffer)
+        return buffer.getvalue()
+
+    # Вставка отсортированного пакета values[lo:hi]: спуск по дереву делит пакет по ключам узлов,
+    # поддеревья склеиваются обратно через _join. Затрагиваются только пути к новым ключам
+    def _insert_sorted(self, node: Node, values, lo: int, hi: int) -> Node:
+        if lo >= hi:
+            return node
+        if not node:
+            return self._build_sorted(values[lo:hi])
+        first = bisect.bisect_left(values, node.val, lo, hi)
+        last = first
+        if self.multiset:
+            last = bisect.bisect_right(values, node.val, first, hi)
+            if last > first:
+                node = self._own(node)
+                node.count += last - first
+        left = self._insert_sorted(node.left, values, lo, first)
+        right = self._insert_sorted(node.right, values, last, hi)
+        return self._join(left, node, right)
+
+    # Удаление отсортированного пакета: каждый ключ снимает одну копию
+    def _difference(self, node: Node, values, lo: int, hi: int):
+        if lo >= hi or not node:
+            return node, 0
+        first = bisect.bisect_left(values, node.val, lo, hi)
+        last = bisect.bisect_right(values, node.val, first, hi)
+        taken = min(node.count, last - first)
+        to_left = 0
+        if last - first > taken:
+            # Без режима мультимножества равные ключи могут лежать и в левом поддереве
+            equal_left = self._rank_in(node.left, node.val, True) - self._rank_in(node.left, node.val)
+            to_left = min(last - first - taken, equal_left)
+        left, removed_left = self._difference(node.left, values, lo, first + to_left)
+        right, removed_right = self._difference(node.right, values, first + to_left + taken, hi)
+        removed = taken + removed_left + removed_right
+        if taken == node.count:
+            return self._join2(left, right), removed
+        if taken:
+            node = self._own(node)
+            node.count -= taken
+        return self._join(left, node, right), removed
+
+    # Пакетные операции: пакет сортируется один раз и применяется за один проход
+    def insert_many(self, values) -> int:
+        values = sorted(values)
+        self.root = self._insert_sorted(self.root, values, 0, len(values))
+        return len(values)
+
+    def delete_many(self, values) -> int:
+        values = sorted(values)
+        self.root, removed = self._difference(self.root, values, 0, len(values))
+        return removed
+
+    # Двоичный формат: заголовок (сигнатура, версия, флаги, число записей) и отсортированные
+    # ключи int64 little-endian; в режиме мультимножества записи - пары (ключ, кратность)
+    _HEADER = struct.Struct('<4sHHQ')
+    _MAGIC = b'AVLT'
+    _VERSION = 1
+    _CHUNK = 1 << 16
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            self.dump(f)
+
+    # Потоковая запись: ключи уходят блоками по мере обхода, дерево целиком не копируется
+    def dump(self, f):
+        records = sum(1 for _ in self.iter_inorder()) if self.multiset else len(self)
+        f.write(self._HEADER.pack(self._MAGIC, self._VERSION, int(self.multiset), records))
+        chunk = array('q')
+        for node in self.iter_inorder():
+            chunk.append(node.val)
+            if self.multiset:
+                chunk.append(node.count)
+            if len(chunk) >= self._CHUNK:
+                self._write_chunk(f, chunk)
+                chunk = array('q')
+        self._write_chunk(f, chunk)
+
+    @staticmethod
+    def _write_chunk(f, chunk):
+        if sys.byteorder == 'big':
+            chunk.byteswap()
+        f.write(chunk.tobytes())
+
+    @classmethod
+    def _parse_header(cls, data):
+        if len(data) < cls._HEADER.size:
+            raise ValueError("Файл обрезан")
+        magic, version, flags, records = cls._HEADER.unpack(data[:cls._HEADER.size])
+        if magic != cls._MAGIC or version != cls._VERSION:
+            raise ValueError("Неизвестный формат файла дерева")
+        return bool(flags & 1), records
+
+    # Загрузка через mmap: ключи читаются прямо из отображённого файла, сборка за O(n)
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            multiset, records = cls._parse_header(mm)
+            width = 2 if multiset else 1
+            if len(mm) != cls._HEADER.size + 8 * width * records:
+                raise ValueError("Размер файла не совпадает с заголовком")
+            with memoryview(mm) as view, view[cls._HEADER.size:].cast('q') as ints:
+                if sys.byteorder == 'big':
+                    swapped = array('q', ints)
+                    swapped.byteswap()
+                    return cls._from_records(multiset, records, iter(swapped))
+                return cls._from_records(multiset, records, iter(ints))
+
+    # Потоковое чтение из файла или канала блоками фиксированного размера
+    @classmethod
+    def read(cls, f):
+        multiset, records = cls._parse_header(f.read(cls._HEADER.size))
+
+        def _ints():
+            while True:
+                chunk = array('q')
+                chunk.frombytes(f.read(8 * cls._CHUNK))
+                if not chunk:
+                    return
+                if sys.byteorder == 'big':
+                    chunk.byteswap()
+                yield from chunk
+
+        return cls._from_records(multiset, records, _ints())
+
+    @classmethod
+    def _from_records(cls, multiset, records, ints):
+        tree = cls(multiset)
+
+        def _nodes():
+            prev = None
+            for _ in range(records):
+                val = next(ints, None)
+                count = next(ints, None) if multiset else 1
+                if val is None or count is None:
+                    raise ValueError("Файл обрезан")
+                if prev is not None and (val < prev or (multiset and val == prev)):
+                    raise ValueError("Ключи в файле не отсортированы")
+                if count < 1:
+                    raise ValueError("Файл повреждён")
+                node = tree._new_node(val)
+                node.count = count
+                prev = val
+                yield node
+
+        with _gc_paused():
+            tree.root = tree._build(_nodes(), records)
+        return tree
 
     #генератор деревье
-    def generate_random_tree(self, target_height=5):
-        values = set()
-        while self.get_height(self.root) < target_height:
-            val = random.randint(1, 100)
-            if val not in values:
-                self.insert(val)
-                values.add(val)
+    # Большие деревья с заданным распределением ключей строит workload.generate_tree
+    def generate_random_tree(self, target_height=5, seed=None):
+        if target_height <= 0:
+            return
+        rnd = random.Random(seed)
+        # Сбалансированное дерево из n узлов имеет высоту ровно target_height
+        n = rnd.randint(2 ** (target_height - 1), 2 ** target_height - 1)
+        values = sorted(rnd.sample(range(1, max(100, 2 * n) + 1), n))
+        generated = self._build((self._new_node(val) for val in values), n)
+        self.root = self._union(self.root, generated)
     #Функиця проверки
     def validate(self):
-        def _validate(node):
-            if not node:
-                return True
-            balance = self.get_balance(node)
-            left = _validate(node.left)
-            right = _validate(node.right)
-            return abs(balance) <= 1 and left and right
-
-        return _validate(self.root)
\ No newline at end of file
+        for node in self.iter_postorder():
+            if abs(self.get_balance(node)) > 1:
+                return False
+            if node.height != 1 + max(self.get_height(node.left), self.get_height(node.right)):
+                return False
+        return True
+
+
+def _set_operation_worker(op, left, right):
+    a = AVLTree.read(io.BytesIO(left))
+    b = AVLTree.read(io.BytesIO(right))
+    result = AVLTree(a.multiset)
+    result.root = result._set_operation_nodes(op, a.root, b.root)
+    buffer = io.BytesIO()
+    result.dump(buffer)
+    return buffer.getvalue()
+
+
+class AVLSnapshot(AVLTree):
+    # Неизменяемый срез дерева: делит узлы с деревом, поддерживает только чтение
+    def __init__(self, tree: AVLTree):
+        self._frozen = False
+        super().__init__(tree.multiset)
+        self.root = tree.root
+        self._frozen = True
+
+    @property
+    def root(self):
+        return self._root
+
+    @root.setter
+    def root(self, node):
+        if self._frozen:
+            raise TypeError("Снимок дерева доступен только для чтения")
+        self._root = node
+
+    def _new_node(self, val):
+        raise TypeError("Снимок дерева доступен только для чтения")
+
+    def _own(self, node):
+        raise TypeError("Снимок дерева доступен только для чтения")
+
+    def snapshot(self):
+        return self
\ No newline at end of file
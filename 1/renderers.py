@@ -0,0 +1,371 @@
+import tkinter as tk
+
+import numpy as np
+
+from layout import LEVEL, SEPARATION, LayoutCache
+
+NODE_COLOR = '#89CFF0'
+
+plt = FigureCanvasTkAgg = LineCollection = to_rgba = None
+
+
+# matplotlib необязателен и тяжёл (один импорт pyplot - больше полсекунды),
+# поэтому грузится только при создании первого рисунка matplotlib
+def _load_matplotlib():
+    global plt, FigureCanvasTkAgg, LineCollection, to_rgba
+    if plt is not None:
+        return
+    try:
+        import matplotlib.pyplot as pyplot
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg as canvas_class
+        from matplotlib.collections import LineCollection as line_collection
+        from matplotlib.colors import to_rgba as rgba
+    except ImportError as error:
+        raise RuntimeError("Для этой отрисовки нужен matplotlib") from error
+    FigureCanvasTkAgg, LineCollection, to_rgba = canvas_class, line_collection, rgba
+    plt = pyplot
+
+
+def node_label(node):
+    return str(node.val) if node.count == 1 else f"{node.val}×{node.count}"
+
+
+# Отрисовка прямо на tk.Canvas. У видимых узлов постоянные элементы холста - круг, подпись
+# и ребро от родителя, - которые после изменения дерева только двигаются и перекрашиваются.
+#
+# Рисуется только то, что попадает в окно: видимость считается по массивам раскладки
+# векторно, а элементы холста есть лишь у видимых узлов. Поддерево, дети которого на
+# экране ближе COLLAPSE_PX или которое глубже max_depth, сворачивается в значок с числом
+# элементов. Перетаскивание мышью двигает вид, колесо масштабирует вокруг курсора
+class CanvasRenderer:
+    RADIUS = 14
+    UNIT = 36 / SEPARATION  # пикселей на единицу раскладки по горизонтали при масштабе 1
+    STEP = 56 / LEVEL       # и по вертикали
+    FONT = ('Arial', 9, 'bold')
+    COLLAPSE_PX = 24
+    GLYPH = (16, 22)        # полуширина и высота значка свёрнутого поддерева
+    ZOOM_STEP = 1.25
+    ZOOM_LIMITS = (0.001, 4.0)
+
+    def __init__(self, master, max_depth=None):
+        self.canvas = tk.Canvas(master, background='white', highlightthickness=0)
+        self.widget = self.canvas
+        self.max_depth = max_depth
+        self.items = {}   # uid -> [круг, подпись, ребро, значок, подпись значка]
+        self.colors = {}  # uid -> цвет, заданный через paint
+        self._drag = None
+        self.reset()
+
+        canvas = self.canvas
+        canvas.bind('<Configure>', self._on_resize)
+        canvas.bind('<ButtonPress-1>', self._start_drag)
+        canvas.bind('<B1-Motion>', self._drag_to)
+        canvas.bind('<ButtonRelease-1>', lambda event: self._refresh())
+        canvas.bind('<MouseWheel>', lambda event: self._zoom_at(event.x, event.y, event.delta > 0))
+        canvas.bind('<Button-4>', lambda event: self._zoom_at(event.x, event.y, True))
+        canvas.bind('<Button-5>', lambda event: self._zoom_at(event.x, event.y, False))
+
+    # Пустой холст под новое дерево, элементы и кэш раскладки прежнего выбрасываются
+    def reset(self):
+        self.canvas.delete('all')
+        self.items.clear()
+        self.colors.clear()
+        self.layout = LayoutCache()
+        self.zoom = 1.0
+        self.origin = (0.0, self.RADIUS + 10.0)  # экранная точка начала координат раскладки
+        self.centered = True  # пока вид не двигали, дерево вписывается в окно по ширине
+
+    def close(self):
+        self.canvas.destroy()
+
+    def draw(self, tree):
+        changed, removed = self.layout.update(tree)
+        for uid in removed:
+            self._forget(uid)
+        self._refresh(changed, moved=self.centered and self._fit())
+
+    def paint(self, colors, reset=False):
+        if reset:
+            self.colors.clear()
+            self.canvas.itemconfigure('node', fill=NODE_COLOR)
+        self.colors.update(colors)
+        for uid, color in colors.items():
+            items = self.items.get(uid)
+            if items is not None:
+                self.canvas.itemconfigure(items[0], fill=color)
+
+    def _forget(self, uid):
+        items = self.items.pop(uid, None)
+        if items is not None:
+            self.canvas.delete(*(item for item in items if item is not None))
+
+    # Экранные координаты всех строк раскладки, видимые строки и свёрнутые узлы
+    def _visible(self):
+        layout = self.layout
+        ox, oy = self.origin
+        sx = layout.xs * (self.UNIT * self.zoom) + ox
+        sy = -layout.ys * (self.STEP * self.zoom) + oy
+        rows = np.arange(len(layout.uids))
+        parent = layout.parent
+        live = layout.uids >= 0
+        child = live & (parent != rows)
+
+        # Узел сворачивается, если его дети на экране слишком тесно или он на предельной глубине
+        spread = np.zeros(len(rows))
+        np.maximum.at(spread, parent[child], np.abs(sx[child] - sx[parent[child]]))
+        has_children = np.zeros(len(rows), dtype=bool)
+        has_children[parent[child]] = True
+        collapsed = has_children & (2 * spread < self.COLLAPSE_PX)
+        if self.max_depth is not None:
+            depth = np.rint(-np.nan_to_num(layout.ys) / LEVEL)
+            collapsed |= has_children & (depth >= self.max_depth)
+
+        # Скрыт узел, у которого свёрнут хоть один предок: удвоение указателей по родителям
+        hidden = collapsed[parent] & child
+        jump = parent
+        height = layout.nodes[layout.root].height if layout.root is not None else 0
+        for _ in range(max(height - 1, 0).bit_length()):
+            hidden |= hidden[jump]
+            jump = jump[jump]
+
+        margin = self.RADIUS + self.GLYPH[1]
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        with np.errstate(invalid='ignore'):
+            shown = (live & ~hidden & (sx > -margin) & (sx < width + margin)
+                     & (sy > -margin) & (sy < height + margin))
+        return np.flatnonzero(shown), sx, sy, collapsed
+
+    # Синхронизация элементов холста с видимой частью дерева. Трогаются только видимые узлы:
+    # новые создаются, ушедшие из вида удаляются, остальные двигаются, если сдвинулись сами,
+    # их родитель или весь вид (moved)
+    def _refresh(self, changed=frozenset(), moved=False):
+        layout, canvas, r = self.layout, self.canvas, self.RADIUS
+        rows, sx, sy, collapsed = self._visible()
+        uids = layout.uids[rows].tolist()
+        visible = set(uids)
+        for uid in [uid for uid in self.items if uid not in visible]:
+            self._forget(uid)
+
+        new_edges = False
+        for uid, row in zip(uids, rows.tolist()):
+            x, y = float(sx[row]), float(sy[row])
+            parent = int(layout.parent[row])
+            items = self.items.get(uid)
+            fresh = items is None
+            if fresh:
+                items = self.items[uid] = [
+                    canvas.create_oval(x - r, y - r, x + r, y + r,
+                                       fill=self.colors.get(uid, NODE_COLOR), tags='node'),
+                    canvas.create_text(x, y, text=node_label(layout.nodes[uid]), font=self.FONT, tags='label'),
+                    None, None, None,
+                ]
+            elif moved or uid in changed:
+                canvas.coords(items[0], x - r, y - r, x + r, y + r)
+                canvas.coords(items[1], x, y)
+                canvas.itemconfigure(items[1], text=node_label(layout.nodes[uid]))
+
+            if parent == row:
+                if items[2] is not None:
+                    canvas.delete(items[2])
+                    items[2] = None
+            elif items[2] is None:
+                items[2] = canvas.create_line(float(sx[parent]), float(sy[parent]), x, y, tags='edge')
+                new_edges = True
+            elif fresh or moved or uid in changed or int(layout.uids[parent]) in changed:
+                canvas.coords(items[2], float(sx[parent]), float(sy[parent]), x, y)
+
+            if collapsed[row]:
+                self._glyph(uid, items, x, y, fresh or moved or uid in changed)
+            elif items[3] is not None:
+                canvas.delete(items[3], items[4])
+                items[3] = items[4] = None
+        if new_edges:
+            canvas.tag_lower('edge')
+
+    def _glyph(self, uid, items, x, y, update):
+        half, height = self.GLYPH
+        top = y + self.RADIUS
+        points = (x, top, x - half, top + height, x + half, top + height)
+        node = self.layout.nodes[uid]
+        text = f"+{node.size - node.count}"
+        if items[3] is None:
+            items[3] = self.canvas.create_polygon(*points, fill='#D0D0D0', outline='#808080', tags='glyph')
+            items[4] = self.canvas.create_text(x, top + height * 0.65, text=text,
+                                               font=('Arial', 7), tags='glyph')
+        elif update:
+            self.canvas.coords(items[3], *points)
+            self.canvas.coords(items[4], x, top + height * 0.65)
+            self.canvas.itemconfigure(items[4], text=text)
+
+    # Масштаб, при котором дерево целиком входит в окно по ширине, но не крупнее обычного.
+    # Возвращает True, если вид изменился
+    def _fit(self):
+        width = self.canvas.winfo_width()
+        if width <= 1 or self.layout.root is None:
+            return False
+        x0, x1 = np.nanmin(self.layout.xs), np.nanmax(self.layout.xs)
+        low, high = self.ZOOM_LIMITS
+        zoom = min(max((width - 2 * self.RADIUS) / ((x1 - x0) * self.UNIT or 1), low), 1.0)
+        origin = (width / 2 - (x0 + x1) / 2 * self.UNIT * zoom, self.origin[1])
+        if (zoom, origin) == (self.zoom, self.origin):
+            return False
+        self.zoom, self.origin = zoom, origin
+        return True
+
+    def _on_resize(self, event):
+        self._refresh(moved=self.centered and self._fit())
+
+    def _start_drag(self, event):
+        self._drag = (event.x, event.y)
+
+    # Во время перетаскивания элементы сдвигаются одной командой холста,
+    # новые узлы в окне появляются, когда кнопку отпустят
+    def _drag_to(self, event):
+        dx, dy = event.x - self._drag[0], event.y - self._drag[1]
+        self._drag = (event.x, event.y)
+        self.canvas.move('all', dx, dy)
+        self.origin = (self.origin[0] + dx, self.origin[1] + dy)
+        self.centered = False
+
+    def _zoom_at(self, x, y, zoom_in):
+        low, high = self.ZOOM_LIMITS
+        zoom = min(max(self.zoom * (self.ZOOM_STEP if zoom_in else 1 / self.ZOOM_STEP), low), high)
+        # Точка под курсором остаётся на месте
+        ratio = zoom / self.zoom
+        self.origin = (x - (x - self.origin[0]) * ratio, y - (y - self.origin[1]) * ratio)
+        self.zoom = zoom
+        self.centered = False
+        self._refresh(moved=True)
+
+
+class MatplotlibRenderer:
+    # Рисунок matplotlib с постоянными artist'ами: узлы - одна коллекция точек, рёбра - одна
+    # коллекция линий, у каждого узла своя подпись. Строки массивов те же, что у раскладки,
+    # поэтому координаты и рёбра обновляются целыми массивами, а подписи - только у изменённых узлов
+    def __init__(self, master):
+        _load_matplotlib()
+        self.fig, self.ax = plt.subplots(figsize=(5, 4))
+        self.ax.set_axis_off()
+        self.canvas = FigureCanvasTkAgg(self.fig, master=master)
+        self.widget = self.canvas.get_tk_widget()
+
+        self.labels = {}  # uid -> Text
+        self.edges = LineCollection([], colors='k', linewidths=1, zorder=1)
+        self.ax.add_collection(self.edges)
+        self.points = self.ax.scatter([], [], s=800, zorder=2)
+        self.reset()
+
+    def reset(self):
+        for text in self.labels.values():
+            text.remove()
+        self.labels.clear()
+        self.layout = LayoutCache()
+        self.colors = np.zeros((0, 4))
+        self.points.set_offsets(np.zeros((0, 2)))
+        self.edges.set_segments([])
+
+    # Фигура pyplot живёт в его глобальном реестре, пока её явно не закроют
+    def close(self):
+        self.widget.destroy()
+        plt.close(self.fig)
+
+    def draw(self, tree):
+        layout = self.layout
+        changed, removed = layout.update(tree)
+        for uid in removed:
+            self.labels.pop(uid).remove()
+
+        if len(self.colors) < len(layout.uids):
+            grown = np.zeros((len(layout.uids), 4))
+            grown[:len(self.colors)] = self.colors
+            self.colors = grown
+        for uid in changed:
+            row = layout.index[uid]
+            x, y = layout.xs[row], layout.ys[row]
+            label = node_label(layout.nodes[uid])
+            text = self.labels.get(uid)
+            if text is None:
+                self.colors[row] = to_rgba(NODE_COLOR)
+                self.labels[uid] = self.ax.text(x, y, label, ha='center', va='center',
+                                                fontsize=9, fontweight='bold', zorder=3)
+            else:
+                text.set_position((x, y))
+                text.set_text(label)
+
+        if changed or removed:
+            # Пустые строки и ребро над корнем - NaN, такие точки и линии не рисуются
+            offsets = np.column_stack([layout.xs, layout.ys])
+            segments = np.stack([offsets[layout.parent], offsets], axis=1)
+            segments[layout.parent == np.arange(len(offsets))] = np.nan
+            self.points.set_offsets(offsets)
+            self.points.set_facecolors(self.colors)
+            self.edges.set_segments(segments)
+            self._rescale()
+        self.canvas.draw_idle()
+
+    def _rescale(self):
+        if not self.labels:
+            return
+        x0, x1 = np.nanmin(self.layout.xs), np.nanmax(self.layout.xs)
+        y0, y1 = np.nanmin(self.layout.ys), np.nanmax(self.layout.ys)
+        self.ax.set_xlim(x0 - 0.5, x1 + 0.5)
+        self.ax.set_ylim(y0 - 0.5, y1 + 0.5)
+
+    # Перекраска узлов без пересчёта раскладки; reset возвращает остальным цвет по умолчанию
+    def paint(self, colors, reset=False):
+        if reset:
+            self.colors[:] = to_rgba(NODE_COLOR)
+        for uid, color in colors.items():
+            row = self.layout.index.get(uid)
+            if row is not None:
+                self.colors[row] = to_rgba(color)
+        self.points.set_facecolors(self.colors)
+        self.canvas.draw_idle()
+
+
+RENDERERS = {
+    'canvas': CanvasRenderer,
+    'matplotlib': MatplotlibRenderer,
+}
+
+
+def make_renderer(name, master):
+    return RENDERERS[name](master)
+
+
+# Пул рисунков для окон деревьев. Рисунок закрытого дерева очищается и ждёт следующего,
+# поэтому split и merge, которые постоянно открывают и закрывают окна, не плодят новые
+# фигуры. Свободных держится не больше spare, лишние закрываются по-настоящему, а всего
+# живых рисунков не больше limit. Виджеты принадлежат общему master и переживают окна деревьев
+class RendererPool:
+    def __init__(self, master, name='canvas', limit=8, spare=2):
+        self.master = master
+        self.name = name
+        self.limit = limit
+        self.spare = spare
+        self.free = []
+        self.in_use = 0
+
+    def available(self):
+        return self.limit - self.in_use
+
+    def acquire(self):
+        if self.in_use >= self.limit:
+            raise RuntimeError(f"Открыто слишком много деревьев (не больше {self.limit})")
+        renderer = self.free.pop() if self.free else make_renderer(self.name, self.master)
+        self.in_use += 1
+        return renderer
+
+    def release(self, renderer):
+        self.in_use -= 1
+        renderer.widget.pack_forget()
+        if len(self.free) < self.spare:
+            renderer.reset()
+            self.free.append(renderer)
+        else:
+            renderer.close()
+
+    def close(self):
+        for renderer in self.free:
+            renderer.close()
+        self.free.clear()
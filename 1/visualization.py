@@ -1,10 +1,73 @@
+import argparse
+import itertools
+import queue
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import networkx as nx
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk, messagebox, simpledialog, filedialog
 from main import AVLTree
-import time
+from renderers import RENDERERS, RendererPool
+
+CURRENT_COLOR = '#FF0000'  # Текущий узел - красный
+VISITED_COLOR = '#FFAAAA'  # Пройденные узлы - светло-красный
+
+
+class BackgroundTasks:
+    # Тяжёлые операции выполняются в рабочем потоке, а их результаты применяются в главном
+    # цикле Tk: поток кладёт готовую задачу в очередь, которую опрашивает after().
+    # Задачи работают с копиями и снимками деревьев, поэтому отмена просто выбрасывает результат
+    POLL_MS = 50
+
+    def __init__(self, master, on_change):
+        self.master = master
+        self.on_change = on_change  # вызывается со списком названий незавершённых задач
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.results = queue.Queue()
+        self.pending = {}  # номер -> (название, future, on_done, on_finish)
+        self._ids = itertools.count(1)
+        self._poll_job = None
+
+    def submit(self, title, fn, on_done, on_finish=None):
+        task = next(self._ids)
+        future = self.executor.submit(fn)
+        self.pending[task] = (title, future, on_done, on_finish)
+        future.add_done_callback(lambda f: self.results.put(task))
+        if self._poll_job is None:
+            self._poll_job = self.master.after(self.POLL_MS, self._poll)
+        self.on_change(self.titles())
+        return task
+
+    def titles(self):
+        return [title for title, *_ in self.pending.values()]
+
+    def cancel_all(self):
+        for task in list(self.pending):
+            title, future, on_done, on_finish = self.pending.pop(task)
+            future.cancel()  # ещё не начатая задача не запустится, начатая доработает вхолостую
+            if on_finish:
+                on_finish()
+        self.on_change([])
+
+    def _poll(self):
+        self._poll_job = None
+        while True:
+            try:
+                task = self.results.get_nowait()
+            except queue.Empty:
+                break
+            entry = self.pending.pop(task, None)
+            if entry is None:
+                continue  # задачу отменили
+            title, future, on_done, on_finish = entry
+            if on_finish:
+                on_finish()
+            error = future.exception()
+            if error is not None:
+                messagebox.showerror("Ошибка", f"{title}: {error}")
+            else:
+                on_done(future.result())
+            self.on_change(self.titles())
+        if self.pending:
+            self._poll_job = self.master.after(self.POLL_MS, self._poll)
 
 
 class TreeManager:
@@ -26,7 +89,7 @@ class TreeManager:
 
 
 class TreeVisualization:
-    def __init__(self, master):
+    def __init__(self, master, renderer='canvas', max_canvases=8):
         self.master = master
         self.master.title("AVL Tree Manager")
         self.master.geometry("1400x900")
@@ -35,8 +98,13 @@ class TreeVisualization:
         self.current_frames = {}
         self.active_tree = None
         self.animation_speed = 500  # мСкорость аниации
+        self.animation = None
+        self.max_depth = None
+        self.busy_trees = set()  # деревья, над которыми идёт фоновая операция
 
         self.setup_ui()
+        self.renderers = RendererPool(self.tree_container, renderer, max_canvases)
+        self.tasks = BackgroundTasks(self.master, self.show_progress)
         self.create_new_tree()
 
     def setup_ui(self):
@@ -60,7 +128,8 @@ class TreeVisualization:
             ("Прямой обход", self.preorder_traversal),
             ("Центральный обход", self.inorder_traversal),
             ("Обратный обход", self.postorder_traversal),
-            ("Количество элементов", self.show_node_count)
+            ("Количество элементов", self.show_node_count),
+            ("Экспорт", self.export_trees)
         ]
 
         for text, cmd in op_buttons:
@@ -71,7 +140,27 @@ class TreeVisualization:
         self.speed_scale = tk.Scale(control_frame, from_=100, to=1000, orient=tk.HORIZONTAL, label="Скорость анимации (мс)")
         self.speed_scale.set(self.animation_speed)
         self.speed_scale.pack(side=tk.LEFT, padx=10)
-        self.speed_scale.bind("<Motion>", self.update_animation_speed)
+        self.speed_scale.configure(command=self.update_animation_speed)
+
+        self.pause_button = ttk.Button(control_frame, text="Пауза", command=self.toggle_animation_pause)
+        self.pause_button.pack(side=tk.LEFT, padx=2)
+        ttk.Button(control_frame, text="Стоп", command=self.stop_animation).pack(side=tk.LEFT, padx=2)
+
+        # Глубже этого уровня поддеревья сворачиваются в значок, 0 - без ограничения
+        ttk.Label(control_frame, text="Глубина").pack(side=tk.LEFT, padx=(10, 2))
+        self.depth_spinbox = ttk.Spinbox(control_frame, from_=0, to=64, width=4, command=self.update_max_depth)
+        self.depth_spinbox.set(0)
+        self.depth_spinbox.bind('<Return>', lambda event: self.update_max_depth())
+        self.depth_spinbox.pack(side=tk.LEFT, padx=2)
+
+        # Индикатор фоновых операций, виден только пока они идут
+        self.progress_frame = ttk.Frame(self.master)
+        self.progress_label = ttk.Label(self.progress_frame)
+        self.progress_label.pack(side=tk.LEFT, padx=5)
+        self.progress_bar = ttk.Progressbar(self.progress_frame, mode='indeterminate', length=200)
+        self.progress_bar.pack(side=tk.LEFT, padx=5)
+        ttk.Button(self.progress_frame, text="Отменить",
+                   command=lambda: self.tasks.cancel_all()).pack(side=tk.LEFT, padx=5)
 
         # Место под дерево
         self.tree_container = ttk.Frame(self.master)
@@ -83,20 +172,71 @@ class TreeVisualization:
         self.tree_container.grid_rowconfigure(0, weight=1)
         self.tree_container.grid_rowconfigure(1, weight=1)
 
-    def update_animation_speed(self, event):
-        self.animation_speed = self.speed_scale.get()
+    def update_animation_speed(self, value):
+        # Анимация читает скорость перед каждым кадром, так что меняется на ходу
+        self.animation_speed = int(value)
+
+    def update_max_depth(self):
+        try:
+            depth = int(self.depth_spinbox.get())
+        except ValueError:
+            return
+        self.max_depth = depth or None
+        for tree_id, frame_data in self.current_frames.items():
+            frame_data['renderer'].max_depth = self.max_depth
+            self.draw_tree(tree_id)
+
+    def show_progress(self, titles):
+        if titles:
+            self.progress_label.configure(text="Выполняется: " + ", ".join(titles))
+            if not self.progress_frame.winfo_ismapped():
+                self.progress_frame.pack(side=tk.TOP, fill=tk.X, padx=5, before=self.tree_container)
+                self.progress_bar.start(15)
+        else:
+            self.progress_bar.stop()
+            self.progress_frame.pack_forget()
+
+    # Запуск операции в фоне. Пока она идёт, деревья tree_ids нельзя менять
+    def tree_busy(self, tree_ids):
+        if any(tree_id in self.busy_trees for tree_id in tree_ids):
+            messagebox.showwarning("Ошибка", "Дерево занято, дождитесь окончания операции")
+            return True
+        return False
+
+    def run_task(self, title, tree_ids, fn, on_done):
+        if self.tree_busy(tree_ids):
+            return
+
+        def _done(result):
+            # Дерево могли закрыть, пока шла операция
+            if all(tree_id in self.tree_manager.trees for tree_id in tree_ids):
+                on_done(result)
+
+        self.busy_trees.update(tree_ids)
+        self.tasks.submit(title, fn, _done, lambda: self.busy_trees.difference_update(tree_ids))
+
+    @staticmethod
+    def _random_tree():
+        tree = AVLTree()
+        tree.generate_random_tree(target_height=3)
+        return tree
 
     def create_new_tree(self, tree=None):
-        new_tree = tree if tree else AVLTree()
-        if not tree:
-            new_tree.generate_random_tree(target_height=3)
+        if tree is None:
+            self.run_task("Новое дерево", [], self._random_tree, self.create_new_tree)
+            return
 
-        tree_id = self.tree_manager.add_tree(new_tree)
-        self.add_tree_frame(tree_id)
+        try:
+            renderer = self.renderers.acquire()
+        except RuntimeError as error:
+            messagebox.showwarning("Ошибка", str(error))
+            return
+        tree_id = self.tree_manager.add_tree(tree)
+        self.add_tree_frame(tree_id, renderer)
         self.update_combobox()
         self.set_active_tree(tree_id)
 
-    def add_tree_frame(self, tree_id):# Новый фраим под дерево
+    def add_tree_frame(self, tree_id, renderer):# Новый фраим под дерево
         frame = ttk.Frame(self.tree_container, relief=tk.SUNKEN, padding=5)
 
         header = ttk.Frame(frame)
@@ -112,17 +252,15 @@ class TreeVisualization:
                    command=lambda: self.close_tree(tree_id),
                    width=3).pack(side=tk.LEFT)
 
-        # Ну собственно интерфейс
-        fig, ax = plt.subplots(figsize=(5, 4))
-        canvas = FigureCanvasTkAgg(fig, master=frame)
-        canvas_widget = canvas.get_tk_widget()
-        canvas_widget.pack(fill=tk.BOTH, expand=True)
+        # Ну собственно интерфейс. Рисунок из пула принадлежит общему контейнеру,
+        # в окне дерева он только показывается и переживает его закрытие
+        renderer.max_depth = self.max_depth
+        renderer.widget.pack(in_=frame, fill=tk.BOTH, expand=True)
+        renderer.widget.lift(frame)
 
         self.current_frames[tree_id] = {
             'frame': frame,
-            'fig': fig,
-            'ax': ax,
-            'canvas': canvas,
+            'renderer': renderer,
             'header': header
         }
 
@@ -154,48 +292,24 @@ class TreeVisualization:
         self.set_active_tree(selected_id)
 
     def draw_tree(self, tree_id):
-        tree = self.tree_manager.trees[tree_id]
-        frame_data = self.current_frames[tree_id]
-        ax = frame_data['ax']
-        ax.clear()
-
-        G = nx.DiGraph()
-        pos = {}
-        labels = {}
-
-        def add_nodes(node, x=0, y=0, layer=1):
-            if node:
-                pos[node.uid] = (x, y)
-                labels[node.uid] = str(node.val)
-                G.add_node(node.uid)
-
-                if node.left:
-                    G.add_edge(node.uid, node.left.uid)
-                    add_nodes(node.left, x - 1 / layer, y - 1, layer + 1)
-                if node.right:
-                    G.add_edge(node.uid, node.right.uid)
-                    add_nodes(node.right, x + 1 / layer, y - 1, layer + 1)
-
-        add_nodes(tree.root)
-
-        if G.nodes:
-            nx.draw(G, pos, ax=ax, labels=labels, with_labels=True,
-                    node_size=800, node_color='#89CFF0',
-                    font_size=9, font_weight='bold')
-
-        frame_data['canvas'].draw()
+        self.current_frames[tree_id]['renderer'].draw(self.tree_manager.trees[tree_id])
+        if self.animation and self.animation.tree_id == tree_id:
+            self.animation.repaint()
 
     def close_tree(self, tree_id):
+        if self.animation and self.animation.tree_id == tree_id:
+            self.stop_animation()
         if tree_id in self.current_frames:
-            self.current_frames[tree_id]['frame'].destroy()
-            del self.current_frames[tree_id]
+            frame_data = self.current_frames.pop(tree_id)
+            self.renderers.release(frame_data['renderer'])
+            frame_data['frame'].destroy()
             self.tree_manager.remove_tree(tree_id)
             self.update_combobox()
             self.rearrange_frames()
 
     def rearrange_frames(self):
-        for widget in self.tree_container.winfo_children():
-            widget.grid_forget()
+        for frame_data in self.current_frames.values():
+            frame_data['frame'].grid_forget()
 
         # Повторяю все кадры
         for i, (tid, frame_data) in enumerate(self.current_frames.items()):
@@ -207,17 +321,41 @@ class TreeVisualization:
         if not self.active_tree:
             messagebox.showwarning("Ошибка", "Выберите дерево!")
             return
+        # Занятость проверяется до копии: copy() замораживает дерево, и отклонённая
+        # операция заставила бы все следующие правки копировать свои пути
+        if self.tree_busy([self.active_tree]):
+            return
 
         value = self.get_input("Введите значение для добавления:")
-        if value is not None:
-            self.tree_manager.trees[self.active_tree].insert(value)
-            self.draw_tree(self.active_tree)
+        if value is None:
+            return
+        tree_id = self.active_tree
+        work = self.tree_manager.trees[tree_id].copy()
+        work.track_changes()
+
+        def _insert():
+            work.insert(value)
+            return work
+
+        self.run_task("Добавление", [tree_id], _insert, lambda result: self.apply_tree(tree_id, result))
+
+    # Подмена корня деревом, посчитанным в фоне: изменённые узлы переносятся в учёт
+    # изменений, и отрисовка остаётся инкрементальной
+    def apply_tree(self, tree_id, result):
+        tree = self.tree_manager.trees[tree_id]
+        tree.root = result.root
+        if tree.changes is not None:
+            tree.changes |= result.changes
+        self.draw_tree(tree_id)
 
     def delete_node(self):
         if not self.active_tree:
             messagebox.showwarning("Ошибка", "Выберите дерево!")
             return
 
+        if self.tree_busy([self.active_tree]):
+            return
+
         value = self.get_input("Введите значение для удаления:")
         if value is not None:
             self.tree_manager.trees[self.active_tree].delete(value)
@@ -238,16 +376,26 @@ class TreeVisualization:
         if not self.active_tree:
             messagebox.showwarning("Ошибка", "Выберите дерево!")
             return
+        if self.tree_busy([self.active_tree]):
+            return
 
         value = self.get_input("Введите значение для разделения:")
         if value is None: return
 
-        original_tree = self.tree_manager.trees[self.active_tree]
-        left_tree, right_tree = original_tree.split(value)
-
-        self.create_new_tree(left_tree)
-        self.create_new_tree(right_tree)
-        self.close_tree(self.active_tree)
+        tree_id = self.active_tree
+        # Фоновый поток читает только снимок, исходное дерево он не трогает
+        snapshot = self.tree_manager.trees[tree_id].snapshot()
+        self.run_task("Разделение", [tree_id], lambda: snapshot.split(value),
+                      lambda halves: self.finish_split(tree_id, halves))
+
+    def finish_split(self, tree_id, halves):
+        # Сначала закрывается исходное дерево, чтобы его рисунок достался одной из половин
+        if self.renderers.available() < 1:
+            messagebox.showwarning("Ошибка", "Для второй половины нет места, закройте одно из деревьев")
+            return
+        self.close_tree(tree_id)
+        for half in halves:
+            self.create_new_tree(half)
 
     def merge_trees(self):
         trees = self.tree_manager.get_tree_ids()
@@ -260,13 +408,17 @@ class TreeVisualization:
 
         if merge_dialog.result:
             tree1_id, tree2_id = merge_dialog.result
-            merged_tree = AVLTree.merge(
-                self.tree_manager.trees[tree1_id],
-                self.tree_manager.trees[tree2_id]
-            )
-            self.create_new_tree(merged_tree)
-            self.close_tree(tree1_id)
-            self.close_tree(tree2_id)
+            if self.tree_busy([tree1_id, tree2_id]):
+                return
+            snapshots = (self.tree_manager.trees[tree1_id].snapshot(),
+                         self.tree_manager.trees[tree2_id].snapshot())
+            self.run_task("Слияние", [tree1_id, tree2_id], lambda: AVLTree.merge(*snapshots),
+                          lambda merged: self.finish_merge(tree1_id, tree2_id, merged))
+
+    def finish_merge(self, tree1_id, tree2_id, merged):
+        self.close_tree(tree1_id)
+        self.close_tree(tree2_id)
+        self.create_new_tree(merged)
 
     def get_input(self, prompt):
         try:
@@ -277,86 +429,121 @@ class TreeVisualization:
             return None
 
     def preorder_traversal(self):
-        if not self.active_tree:
-            messagebox.showwarning("Ошибка", "Выберите дерево!")
-            return
-        tree = self.tree_manager.trees[self.active_tree]
-        nodes = tree.preorder_traversal()
-        self.animate_traversal(nodes)
+        self._animate_order('iter_preorder')
 
     def inorder_traversal(self):
-        if not self.active_tree:
-            messagebox.showwarning("Ошибка", "Выберите дерево!")
-            return
-        tree = self.tree_manager.trees[self.active_tree]
-        nodes = tree.inorder_traversal()
-        self.animate_traversal(nodes)
+        self._animate_order('iter_inorder')
 
     def postorder_traversal(self):
+        self._animate_order('iter_postorder')
+
+    def _animate_order(self, name):
         if not self.active_tree:
             messagebox.showwarning("Ошибка", "Выберите дерево!")
             return
+        # Обход идёт по снимку: правки дерева во время анимации его не ломают
         tree = self.tree_manager.trees[self.active_tree]
-        nodes = tree.postorder_traversal()
-        self.animate_traversal(nodes)
+        self.animate_traversal(getattr(tree.snapshot(), name)())
 
     def animate_traversal(self, nodes):
-        for i, node in enumerate(nodes):
-            self.highlight_node(node, nodes[:i + 1])  # Передаем только пройденные узлы
-            self.master.update()
-            time.sleep(self.animation_speed / 1000)
-        self.draw_tree(self.active_tree)
+        self.stop_animation()
+        renderer = self.current_frames[self.active_tree]['renderer']
+        self.animation = TraversalAnimation(self, self.active_tree, renderer, nodes)
+        self.animation.start()
 
-    def highlight_node(self, node, visited_nodes):
-        tree_id = self.active_tree
-        frame_data = self.current_frames[tree_id]
-        ax = frame_data['ax']
-        ax.clear()
-
-        G = nx.DiGraph()
-        pos = {}
-        labels = {}
-
-        def add_nodes(current_node, x=0, y=0, layer=1):
-            if current_node:
-                pos[current_node.uid] = (x, y)
-                labels[current_node.uid] = str(current_node.val)
-                G.add_node(current_node.uid)
-
-                if current_node.left:
-                    G.add_edge(current_node.uid, current_node.left.uid)
-                    add_nodes(current_node.left, x - 1 / layer, y - 1, layer + 1)
-                if current_node.right:
-                    G.add_edge(current_node.uid, current_node.right.uid)
-                    add_nodes(current_node.right, x + 1 / layer, y - 1, layer + 1)
-
-        add_nodes(self.tree_manager.trees[tree_id].root)
-
-        if G.nodes:
-            node_colors = []
-            for n in G.nodes:
-                if n == node.uid:
-                    node_colors.append('#FF0000')  # Текущий узел - красный
-                elif n in [vn.uid for vn in visited_nodes]:
-                    node_colors.append('#FFAAAA')  # Пройденные узлы - светло-красный
-                else:
-                    node_colors.append('#89CFF0')  # Непройденные узлы
-
-            nx.draw(G, pos, ax=ax, labels=labels, with_labels=True,
-                    node_size=800, node_color=node_colors,
-                    font_size=9, font_weight='bold')
-
-        frame_data['canvas'].draw()
+    def toggle_animation_pause(self):
+        if not self.animation:
+            return
+        if self.animation.paused:
+            self.animation.resume()
+            self.pause_button.configure(text="Пауза")
+        else:
+            self.animation.pause()
+            self.pause_button.configure(text="Продолжить")
+
+    def stop_animation(self):
+        if self.animation:
+            self.animation.cancel()
+
+    def on_animation_finished(self, animation):
+        if self.animation is animation:
+            self.animation = None
+            self.pause_button.configure(text="Пауза")
+
+    # Все открытые деревья в PNG; рисование идёт в отдельных процессах
+    def export_trees(self):
+        directory = filedialog.askdirectory(title="Каталог для картинок")
+        if not directory:
+            return
+        from export import export_trees
+        snapshots = {tree_id: tree.snapshot() for tree_id, tree in self.tree_manager.trees.items()}
+        self.run_task("Экспорт", [], lambda: export_trees(snapshots, directory),
+                      lambda paths: messagebox.showinfo("Экспорт", f"Сохранено картинок: {len(paths)}"))
 
     def show_node_count(self):
         if not self.active_tree:
             messagebox.showwarning("Ошибка", "Выберите дерево!")
             return
         tree = self.tree_manager.trees[self.active_tree]
-        count = len(tree.inorder_traversal())
+        count = len(tree)
         messagebox.showinfo("Количество элементов", f"В дереве {count} элементов")
 
 
+class TraversalAnimation:
+    # Анимация обхода на таймере Tk: кадр берёт следующий узел из ленивого обхода
+    # и перекрашивает только два узла - прошлый текущий и новый текущий
+    def __init__(self, app, tree_id, renderer, nodes):
+        self.app = app
+        self.tree_id = tree_id
+        self.renderer = renderer
+        self.nodes = nodes
+        self.visited = set()
+        self.current = None
+        self.paused = False
+        self._job = None
+
+    def start(self):
+        self._job = self.app.master.after(0, self._step)
+
+    def _step(self):
+        self._job = None
+        node = next(self.nodes, None)
+        if node is None:
+            self.cancel()
+            return
+        colors = {self.current: VISITED_COLOR} if self.current is not None else {}
+        self.current = node.uid
+        self.visited.add(node.uid)
+        colors[node.uid] = CURRENT_COLOR
+        self.renderer.paint(colors)
+        self._job = self.app.master.after(self.app.animation_speed, self._step)
+
+    # Узлы, заново созданные перерисовкой, получают цвет по пройденному пути
+    def repaint(self):
+        colors = dict.fromkeys(self.visited, VISITED_COLOR)
+        if self.current is not None:
+            colors[self.current] = CURRENT_COLOR
+        self.renderer.paint(colors, reset=True)
+
+    def pause(self):
+        if self._job is not None:
+            self.app.master.after_cancel(self._job)
+            self._job = None
+        self.paused = True
+
+    def resume(self):
+        if self.paused:
+            self.paused = False
+            self.start()
+
+    def cancel(self):
+        if self._job is not None:
+            self.app.master.after_cancel(self._job)
+            self._job = None
+        self.renderer.paint({}, reset=True)
+        self.app.on_animation_finished(self)
+
+
 class MergeDialog:
     def __init__(self, parent, tree_ids):
         self.top = tk.Toplevel(parent)
@@ -391,8 +578,14 @@ class MergeDialog:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AVL Tree Manager")
+    parser.add_argument('--renderer', choices=list(RENDERERS), default='canvas',
+                        help="отрисовка: холст Tk или matplotlib")
+    parser.add_argument('--max-canvases', type=int, default=8, help="сколько деревьев может быть открыто")
+    args = parser.parse_args()
+
     root = tk.Tk()
     style = ttk.Style()
     style.configure('Active.TFrame', background='#e1e1e1')
-    app = TreeVisualization(root)
+    app = TreeVisualization(root, args.renderer, args.max_canvases)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,164 @@
+import argparse
+import itertools
+import math
+import random
+import time
+
+from main import AVLTree
+
+
+# Распределения ключей. Каждое получает генератор случайных чисел, число ключей и диапазон
+def _uniform(rnd, n, key_range):
+    return [rnd.randrange(key_range) for _ in range(n)]
+
+
+def _zipf(rnd, n, key_range, exponent=1.1):
+    # Ключ k выпадает с вероятностью, пропорциональной 1 / (k + 1)^exponent. Таблица весов
+    # на весь диапазон заняла бы память по 4n чисел, поэтому выборка идёт методом
+    # rejection-inversion (Hörmann, Derflinger): обращение интеграла непрерывной
+    # огибающей и редкие отказы, память O(1) на ключ
+    def h(x):
+        return math.exp(-exponent * math.log(x))
+
+    def integral(x):
+        log_x = math.log(x)
+        return _expm1_ratio((1 - exponent) * log_x) * log_x
+
+    def inverse(x):
+        t = max(x * (1 - exponent), -1.0)
+        return math.exp(_log1p_ratio(t) * x)
+
+    low, high = integral(1.5) - 1, integral(key_range + 0.5)
+    squeeze = 2 - inverse(integral(2.5) - h(2))
+    keys = []
+    for _ in range(n):
+        while True:
+            u = high + rnd.random() * (low - high)
+            x = inverse(u)
+            k = min(max(int(x + 0.5), 1), key_range)
+            if k - x <= squeeze or u >= integral(k + 0.5) - h(k):
+                keys.append(k - 1)
+                break
+    return keys
+
+
+# log1p(x) / x и expm1(x) / x без потери точности около нуля
+def _log1p_ratio(x):
+    return math.log1p(x) / x if abs(x) > 1e-8 else 1 - x * (0.5 - x * (1 / 3 - x / 4))
+
+
+def _expm1_ratio(x):
+    return math.expm1(x) / x if abs(x) > 1e-8 else 1 + x / 2 * (1 + x / 3 * (1 + x / 4))
+
+
+def _clustered(rnd, n, key_range, clusters=16):
+    centers = [rnd.randrange(key_range) for _ in range(clusters)]
+    spread = max(1, key_range // (clusters * 20))
+    keys = []
+    for _ in range(n):
+        key = int(rnd.gauss(rnd.choice(centers), spread))
+        keys.append(min(max(key, 0), key_range - 1))
+    return keys
+
+
+def _sequential(rnd, n, key_range):
+    return list(range(n))
+
+
+DISTRIBUTIONS = {
+    'uniform': _uniform,
+    'zipf': _zipf,
+    'clustered': _clustered,
+    'sequential': _sequential,
+}
+
+
+def generate_keys(n, distribution='uniform', seed=None, key_range=None):
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Неизвестное распределение: {distribution}")
+    rnd = random.Random(seed)
+    return DISTRIBUTIONS[distribution](rnd, n, key_range or max(1, 4 * n))
+
+
+# Дерево собирается одной сортировкой и линейной сборкой, без поэлементных вставок
+def generate_tree(n, distribution='uniform', seed=None, key_range=None, multiset=False):
+    keys = generate_keys(n, distribution, seed, key_range)
+    if distribution == 'sequential':
+        return AVLTree.from_sorted(keys, multiset)
+    return AVLTree.from_iterable(keys, multiset)
+
+
+# Поток операций к дереву, собранному из тех же ключей: удаления и половина поисков
+# попадают в существующие ключи, вставки и остальные поиски берутся из распределения
+def generate_trace(keys, ops, distribution='uniform', seed=None, key_range=None,
+                   mix=(('insert', 0.5), ('delete', 0.2), ('search', 0.3)), tree='main'):
+    rnd = random.Random(seed)
+    live = list(keys)
+    if distribution == 'sequential':
+        # Последовательная нагрузка продолжает ключи после уже имеющихся
+        fresh = itertools.count(max(live) + 1 if live else 0)
+    else:
+        fresh = iter(generate_keys(ops, distribution, rnd.random(), key_range or max(4, 4 * len(live))))
+    names = [name for name, _ in mix]
+    weights = list(itertools.accumulate(weight for _, weight in mix))
+    for name in rnd.choices(names, cum_weights=weights, k=ops):
+        if name == 'insert' or (name == 'delete' and not live):
+            val = next(fresh)
+            live.append(val)
+            yield 'insert', tree, val
+        elif name == 'delete':
+            # Удаление случайного живого ключа за O(1): меняем местами с последним
+            i = rnd.randrange(len(live))
+            live[i], live[-1] = live[-1], live[i]
+            yield 'delete', tree, live.pop()
+        else:
+            val = rnd.choice(live) if live and rnd.random() < 0.5 else next(fresh)
+            yield 'search', tree, val
+
+
+# Формат трассы: по строке на операцию, «операция дерево значение»
+def write_trace(path, trace):
+    with open(path, 'w', encoding='utf-8') as f:
+        for op, tree, val in trace:
+            f.write(f"{op} {tree} {val}\n")
+
+
+def read_trace(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                op, tree, val = line.split()
+                yield op, tree, int(val)
+
+
+def replay(tree, trace):
+    methods = {'insert': tree.insert, 'delete': tree.delete, 'search': tree.search_count}
+    totals = {op: [0, 0.0] for op in methods}
+    for op, _, val in trace:
+        started = time.perf_counter()
+        methods[op](val)
+        entry = totals[op]
+        entry[0] += 1
+        entry[1] += time.perf_counter() - started
+    return {op: {'count': count, 'seconds': seconds} for op, (count, seconds) in totals.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Генератор деревьев и трасс нагрузки")
+    parser.add_argument('-n', type=int, default=100000, help="число ключей в дереве")
+    parser.add_argument('--ops', type=int, default=100000, help="длина трассы")
+    parser.add_argument('--distribution', choices=list(DISTRIBUTIONS), default='uniform')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tree', help="сохранить дерево в двоичном формате AVLTree.save")
+    parser.add_argument('--trace', help="записать трассу операций")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    keys = generate_keys(args.n, args.distribution, args.seed)
+    tree = AVLTree.from_iterable(keys)
+    print(f"Дерево из {len(tree)} ключей, высота {tree.get_height(tree.root)}, "
+          f"{time.perf_counter() - started:.2f} с")
+    if args.tree:
+        tree.save(args.tree)
+    if args.trace:
+        write_trace(args.trace, generate_trace(keys, args.ops, args.distribution, args.seed + 1))